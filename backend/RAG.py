@@ -1,90 +1,463 @@
-from langchain.chat_models import init_chat_model
-from langchain_chroma import Chroma
-from langchain_huggingface import HuggingFaceEmbeddings
+from cache import SemanticCache
+from context import ContextCompressor
+from embedding import CachedEmbeddings, EmbeddingBatcher
+from faq import GREETINGS, FAQStore, normalize_question
+from formatting import ResponseFormatter, format_response
+from hybrid import LexicalIndex, reciprocal_rank_fusion
+from llm_gateway import LLMGateway
+from memory import truncate_tokens
+from metrics import STAGE_SECONDS, registry, stage_timer
+from singleflight import SingleFlight
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+import asyncio
 import logging
-import re
+import os
+import threading
+import time
+
+import numpy as np
 
 PERSIST_DIR = "../chroma_store"
-#-----LLM----#
-llm = init_chat_model("gemini-2.5-flash", model_provider="google_genai")
+RETRIEVER_K = 5
+# Upper bound on RAG pipelines in flight per worker; extra requests wait their turn.
+RAG_MAX_CONCURRENCY = int(os.getenv("RAG_MAX_CONCURRENCY", "8"))
+# Seconds a request waits before retrying a failed warm-up; in between, stages that failed are handled per request.
+RAG_WARMUP_RETRY = float(os.getenv("RAG_WARMUP_RETRY", "30"))
+# Embedding is CPU-bound, so it gets its own small pool instead of the default executor.
+EMBED_WORKERS = int(os.getenv("RAG_EMBED_WORKERS", "2"))
+# Cosine similarity above which a previous answer is reused for a new question.
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.9"))
+SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", "512"))
+SEMANTIC_CACHE_TTL = float(os.getenv("SEMANTIC_CACHE_TTL", "3600"))
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+EMBED_CACHE_MB = float(os.getenv("EMBED_CACHE_MB", "64"))
+# Optional SQLite file that keeps embeddings across restarts.
+EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH")
+# Concurrent queries arriving within this window are embedded together.
+EMBED_BATCH_WAIT_MS = float(os.getenv("EMBED_BATCH_WAIT_MS", "5"))
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "32"))
+# Fuse BM25 with vector search; short keyword queries skip embedding entirely.
+HYBRID_RETRIEVAL = os.getenv("HYBRID_RETRIEVAL", "1") == "1"
+LEXICAL_ONLY_MAX_WORDS = int(os.getenv("LEXICAL_ONLY_MAX_WORDS", "3"))
+LEXICAL_INDEX_DIRNAME = "lexical_index"
+# "chroma", or "quantized" for the memory-mapped int8/float16 store in quantstore.py.
+VECTOR_STORE = os.getenv("VECTOR_STORE", "chroma")
+QUANTIZED_DIRNAME = "quantized"
+QUANTIZED_DTYPE = os.getenv("QUANTIZED_DTYPE", "int8")
+QUANTIZED_RESCORE = os.getenv("QUANTIZED_RESCORE", "1") == "1"
+# IVF clusters for large corpora (0 = exhaustive scan) and clusters scanned per query.
+QUANTIZED_IVF_LISTS = int(os.getenv("QUANTIZED_IVF_LISTS", "0"))
+QUANTIZED_IVF_PROBES = int(os.getenv("QUANTIZED_IVF_PROBES", "8"))
+# Dedupe, diversify (MMR) and trim retrieved snippets to a token budget before prompting.
+CONTEXT_COMPRESSION = os.getenv("CONTEXT_COMPRESSION", "1") == "1"
+# Candidates fetched per search; compression keeps at most RETRIEVER_K of them.
+RETRIEVER_FETCH_K = int(os.getenv("RETRIEVER_FETCH_K", "8"))
+CONTEXT_MAX_TOKENS = int(os.getenv("CONTEXT_MAX_TOKENS", "600"))
+CONTEXT_DUPLICATE_THRESHOLD = float(os.getenv("CONTEXT_DUPLICATE_THRESHOLD", "0.92"))
+CONTEXT_DIVERSITY = float(os.getenv("CONTEXT_DIVERSITY", "0.3"))
+# Longest a shared (coalesced) answer may take before all its waiters give up.
+RAG_FLIGHT_TIMEOUT = float(os.getenv("RAG_FLIGHT_TIMEOUT", "120"))
+# Chat model tiers: the primary model, then an optional faster fallback ("" disables it).
+LLM_MODEL = os.getenv("LLM_MODEL", "gemini-2.5-flash")
+LLM_FALLBACK_MODEL = os.getenv("LLM_FALLBACK_MODEL", "gemini-2.5-flash-lite")
+# Per-attempt timeout, time allowed until the first streamed token, and the budget for a whole answer.
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+LLM_FIRST_TOKEN_TIMEOUT = float(os.getenv("LLM_FIRST_TOKEN_TIMEOUT", "10"))
+LLM_DEADLINE = float(os.getenv("LLM_DEADLINE", "45"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "1"))
+# Re-send a call slower than the recent p95, for at most LLM_HEDGE_BUDGET of calls.
+LLM_HEDGE = os.getenv("LLM_HEDGE", "1") == "1"
+LLM_HEDGE_BUDGET = float(os.getenv("LLM_HEDGE_BUDGET", "0.1"))
+# Consecutive failures that open a tier's circuit breaker, and seconds before it is tried again.
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_RESET = float(os.getenv("LLM_BREAKER_RESET", "30"))
+# Answer stock questions from the precomputed store written by build_faq.py, without the LLM.
+FAQ_ROUTING = os.getenv("FAQ_ROUTING", "1") == "1"
+FAQ_DIRNAME = "faq"
+# Cosine similarity to an example question above which its stored answer is served.
+FAQ_THRESHOLD = float(os.getenv("FAQ_THRESHOLD", "0.85"))
+# When every model tier fails, answer with the top retrieved passages instead of an error.
+EXTRACTIVE_FALLBACK = os.getenv("EXTRACTIVE_FALLBACK", "1") == "1"
+EXTRACTIVE_SNIPPETS = 3
+EXTRACTIVE_NOTE = "The assistant could not prepare a full answer right now, so these are the most relevant passages from our reference material. Please try again later for a detailed response."
+LLM_ERROR_MESSAGE = "I apologize, but I am currently unable to process your request. Please try again later."
 
-# ---- Embeddings ---- #
-embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+# ---- Answer cache ---- #
+answer_cache = SemanticCache(
+    threshold=SEMANTIC_CACHE_THRESHOLD,
+    maxsize=SEMANTIC_CACHE_SIZE,
+    ttl=SEMANTIC_CACHE_TTL,
+)
 
-# ---- Vector DB ---- #
-if Path(PERSIST_DIR).exists() and any(Path(PERSIST_DIR).iterdir()):
-    try:
-        vectordb = Chroma(persist_directory=PERSIST_DIR, embedding_function=embeddings)
-        print("Loaded existing vector database")
-    except Exception as e:
-        print(f"Error loading DB: {e}")
-        from langchain.docstore.document import Document
-        # Create a comprehensive legal knowledge base
-        legal_docs = [
-            Document(page_content="The Justice Department provides legal services and ensures justice for all citizens."),
-            Document(page_content="You can file a complaint online through the Justice Department portal or visit a local police station."),
-            Document(page_content="Legal rights include fair representation, due process, equality before law, and access to justice."),
-            Document(page_content="Human rights are basic rights and freedoms that belong to every person from birth until death."),
-            Document(page_content="To file a complaint at a police station: visit the station, provide details of the incident, submit a written complaint, and get an acknowledgment receipt."),
-            Document(page_content="Basic human rights include right to life, freedom from torture, freedom of expression, right to work, and right to education."),
-            Document(page_content="The Justice Department handles civil rights violations, discrimination cases, and ensures equal protection under the law."),
-            Document(page_content="You have the right to legal representation. If you cannot afford a lawyer, the court may appoint one for you."),
-            Document(page_content="To report a crime: contact local police, provide all relevant information, preserve any evidence, and follow up on your case."),
-            Document(page_content="The legal system provides remedies for violations of rights through courts, tribunals, and human rights commissions."),
-            Document(page_content="Citizens have the right to information about government activities and decisions that affect them."),
-            Document(page_content="The Justice Department offers legal aid services for those who cannot afford private attorneys."),
-            Document(page_content="You can appeal a court decision if you believe there was an error in the judgment or procedure."),
-            Document(page_content="Fundamental rights are protected by the Constitution and cannot be violated by the state without due process."),
-            Document(page_content="To seek legal help: contact local legal aid clinics, bar associations, or the Justice Department's helpline."),
-            Document(page_content="Human rights are universal, inalienable, indivisible, interdependent, and equal for all people."),
-            Document(page_content="The police must register your complaint and provide you with a copy of the First Information Report (FIR)."),
-            Document(page_content="You have the right to remain silent and not incriminate yourself during police questioning."),
-            Document(page_content="Legal procedures ensure fairness in investigations, trials, and sentencing."),
-            Document(page_content="The justice system includes civil courts, criminal courts, family courts, and administrative tribunals."),
-            Document(page_content="You can file a Right to Information (RTI) application to access government documents and information."),
-            Document(page_content="The Justice Department works to prevent human trafficking, child labor, and other forms of exploitation."),
-            Document(page_content="Everyone has the right to a fair and public hearing by an independent and impartial tribunal."),
-            Document(page_content="Legal aid is available for women, children, senior citizens, and economically disadvantaged individuals."),
-            Document(page_content="You can file a complaint with the Human Rights Commission if your rights have been violated by government authorities."),
-        ]
-        vectordb = Chroma.from_documents(documents=legal_docs, embedding=embeddings, persist_directory=PERSIST_DIR)
-        vectordb.persist()
-else:
-    print("Vector DB not found → creating new one")
-    from langchain.docstore.document import Document
-    # Create a comprehensive legal knowledge base
-    legal_docs = [
-        Document(page_content="The Justice Department provides legal services and ensures justice for all citizens."),
-        Document(page_content="You can file a complaint online through the Justice Department portal or visit a local police station."),
-        Document(page_content="Legal rights include fair representation, due process, equality before law, and access to justice."),
-        Document(page_content="Human rights are basic rights and freedoms that belong to every person from birth until death."),
-        Document(page_content="To file a complaint at a police station: visit the station, provide details of the incident, submit a written complaint, and get an acknowledgment receipt."),
-        Document(page_content="Basic human rights include right to life, freedom from torture, freedom of expression, right to work, and right to education."),
-        Document(page_content="The Justice Department handles civil rights violations, discrimination cases, and ensures equal protection under the law."),
-        Document(page_content="You have the right to legal representation. If you cannot afford a lawyer, the court may appoint one for you."),
-        Document(page_content="To report a crime: contact local police, provide all relevant information, preserve any evidence, and follow up on your case."),
-        Document(page_content="The legal system provides remedies for violations of rights through courts, tribunals, and human rights commissions."),
-        Document(page_content="Citizens have the right to information about government activities and decisions that affect them."),
-        Document(page_content="The Justice Department offers legal aid services for those who cannot afford private attorneys."),
-        Document(page_content="You can appeal a court decision if you believe there was an error in the judgment or procedure."),
-        Document(page_content="Fundamental rights are protected by the Constitution and cannot be violated by the state without due process."),
-        Document(page_content="To seek legal help: contact local legal aid clinics, bar associations, or the Justice Department's helpline."),
-        Document(page_content="Human rights are universal, inalienable, indivisible, interdependent, and equal for all people."),
-        Document(page_content="The police must register your complaint and provide you with a copy of the First Information Report (FIR)."),
-        Document(page_content="You have the right to remain silent and not incriminate yourself during police questioning."),
-        Document(page_content="Legal procedures ensure fairness in investigations, trials, and sentencing."),
-        Document(page_content="The justice system includes civil courts, criminal courts, family courts, and administrative tribunals."),
-        Document(page_content="You can file a Right to Information (RTI) application to access government documents and information."),
-        Document(page_content="The Justice Department works to prevent human trafficking, child labor, and other forms of exploitation."),
-        Document(page_content="Everyone has the right to a fair and public hearing by an independent and impartial tribunal."),
-        Document(page_content="Legal aid is available for women, children, senior citizens, and economically disadvantaged individuals."),
-        Document(page_content="You can file a complaint with the Human Rights Commission if your rights have been violated by government authorities."),
-    ]
-    vectordb = Chroma.from_documents(documents=legal_docs, embedding=embeddings, persist_directory=PERSIST_DIR)
-    vectordb.persist()
-
-retriever = vectordb.as_retriever(search_kwargs={"k": 5})  # Increased from 3 to 5 for better context
+# ---- Knowledge base ---- #
+# Seeded into the vector store when no persisted store can be loaded.
+SEED_DOCUMENTS = [
+    "The Justice Department provides legal services and ensures justice for all citizens.",
+    "You can file a complaint online through the Justice Department portal or visit a local police station.",
+    "Legal rights include fair representation, due process, equality before law, and access to justice.",
+    "Human rights are basic rights and freedoms that belong to every person from birth until death.",
+    "To file a complaint at a police station: visit the station, provide details of the incident, submit a written complaint, and get an acknowledgment receipt.",
+    "Basic human rights include right to life, freedom from torture, freedom of expression, right to work, and right to education.",
+    "The Justice Department handles civil rights violations, discrimination cases, and ensures equal protection under the law.",
+    "You have the right to legal representation. If you cannot afford a lawyer, the court may appoint one for you.",
+    "To report a crime: contact local police, provide all relevant information, preserve any evidence, and follow up on your case.",
+    "The legal system provides remedies for violations of rights through courts, tribunals, and human rights commissions.",
+    "Citizens have the right to information about government activities and decisions that affect them.",
+    "The Justice Department offers legal aid services for those who cannot afford private attorneys.",
+    "You can appeal a court decision if you believe there was an error in the judgment or procedure.",
+    "Fundamental rights are protected by the Constitution and cannot be violated by the state without due process.",
+    "To seek legal help: contact local legal aid clinics, bar associations, or the Justice Department's helpline.",
+    "Human rights are universal, inalienable, indivisible, interdependent, and equal for all people.",
+    "The police must register your complaint and provide you with a copy of the First Information Report (FIR).",
+    "You have the right to remain silent and not incriminate yourself during police questioning.",
+    "Legal procedures ensure fairness in investigations, trials, and sentencing.",
+    "The justice system includes civil courts, criminal courts, family courts, and administrative tribunals.",
+    "You can file a Right to Information (RTI) application to access government documents and information.",
+    "The Justice Department works to prevent human trafficking, child labor, and other forms of exploitation.",
+    "Everyone has the right to a fair and public hearing by an independent and impartial tribunal.",
+    "Legal aid is available for women, children, senior citizens, and economically disadvantaged individuals.",
+    "You can file a complaint with the Human Rights Commission if your rights have been violated by government authorities.",
+]
+
+# ---- Engine ---- #
+class RAGEngine:
+    """
+    Owns the heavyweight RAG resources: the LLM client, the embedding model
+    and the vector store. Nothing is loaded at import time; each resource is
+    built on first use, or all at once by warm_up(). A missing vector store
+    is created from `seed_documents`.
+    """
+
+    def __init__(self, persist_dir: str = PERSIST_DIR, seed_documents=SEED_DOCUMENTS):
+        self.persist_dir = persist_dir
+        self.seed_documents = seed_documents
+        self._lock = threading.RLock()
+        self._llm = None
+        self._embeddings = None
+        self._vectordb = None
+        self._retriever = None
+        self._query_batcher = None
+        self._lexical_index = None
+        self._faq_store = None
+        self._faq_checked = False
+        self.ready = False
+        self.warmup_error = None
+        self.warmup_failed_at = None
+        self._warmup_lock = threading.Lock()
+
+    @property
+    def llm(self):
+        if self._llm is None:
+            with self._lock:
+                if self._llm is None:
+                    self._llm = build_llm_gateway()
+        return self._llm
+
+    @property
+    def embeddings(self):
+        if self._embeddings is None:
+            with self._lock:
+                if self._embeddings is None:
+                    from langchain_huggingface import HuggingFaceEmbeddings
+                    self._embeddings = CachedEmbeddings(
+                        HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL),
+                        model_name=EMBEDDING_MODEL,
+                        max_memory_mb=EMBED_CACHE_MB,
+                        persist_path=EMBED_CACHE_PATH,
+                    )
+        return self._embeddings
+
+    @property
+    def vectordb(self):
+        if self._vectordb is None:
+            with self._lock:
+                if self._vectordb is None:
+                    self._vectordb = self._open_vectordb()
+        return self._vectordb
+
+    @property
+    def collection(self):
+        """The store's low-level collection API (get/query/upsert/delete), for either backend."""
+        vectordb = self.vectordb
+        return vectordb if VECTOR_STORE == "quantized" else vectordb._collection
+
+    @property
+    def retriever(self):
+        if self._retriever is None:
+            self._retriever = self.vectordb.as_retriever(search_kwargs={"k": RETRIEVER_K})  # Increased from 3 to 5 for better context
+        return self._retriever
+
+    @property
+    def query_batcher(self):
+        if self._query_batcher is None:
+            self._query_batcher = EmbeddingBatcher(
+                self.embeddings,
+                executor=embed_executor,
+                max_batch=EMBED_BATCH_SIZE,
+                max_wait_ms=EMBED_BATCH_WAIT_MS,
+            )
+        return self._query_batcher
+
+    @property
+    def lexical_index_dir(self) -> Path:
+        return Path(self.persist_dir) / LEXICAL_INDEX_DIRNAME
+
+    @property
+    def lexical_index(self):
+        """BM25 index over the vector store contents, or None when hybrid retrieval is off."""
+        if not HYBRID_RETRIEVAL:
+            return None
+        if self._lexical_index is None:
+            with self._lock:
+                if self._lexical_index is None:
+                    if LexicalIndex.exists(self.lexical_index_dir):
+                        self._lexical_index = LexicalIndex.load(self.lexical_index_dir)
+                    else:
+                        self._lexical_index = self.rebuild_lexical_index()
+        return self._lexical_index
+
+    def rebuild_lexical_index(self):
+        index = LexicalIndex.build_from_collection(self.collection)
+        index.save(self.lexical_index_dir)
+        self._lexical_index = index
+        return index
+
+    def update_lexical_index(self, removed_ids, doc_ids, texts):
+        """Applies a change to the store (ids removed, texts added or replaced) to the saved BM25 index."""
+        with self._lock:
+            if not LexicalIndex.exists(self.lexical_index_dir):
+                return self.rebuild_lexical_index()
+            index = LexicalIndex.load(self.lexical_index_dir).updated(removed_ids, doc_ids, texts)
+            index.save(self.lexical_index_dir)
+            self._lexical_index = index
+            return index
+
+    def lexical_search(self, q: str, k: int):
+        """Texts of the k best BM25 hits, best first, read from the vector store by id."""
+        doc_ids = self.lexical_index.search_ids(q, k)
+        if not doc_ids:
+            return []
+        found = self.collection.get(ids=doc_ids, include=["documents"])
+        texts = dict(zip(found["ids"], found["documents"]))
+        return [texts[doc_id] for doc_id in doc_ids if doc_id in texts]
+
+    def is_keyword_query(self, q: str) -> bool:
+        index = self.lexical_index
+        return index is not None and index.is_keyword_query(q, LEXICAL_ONLY_MAX_WORDS)
+
+    @property
+    def faq_dir(self) -> Path:
+        return Path(self.persist_dir) / FAQ_DIRNAME
+
+    @property
+    def faq_store(self):
+        """The FAQ answer store, or None when routing is off, it was never built or its embedding model differs."""
+        if not FAQ_ROUTING:
+            return None
+        if not self._faq_checked:
+            with self._lock:
+                if not self._faq_checked:
+                    self._faq_store = self._open_faq_store()
+                    self._faq_checked = True
+        return self._faq_store
+
+    def _open_faq_store(self):
+        if not FAQStore.exists(self.faq_dir):
+            return None
+        try:
+            store = FAQStore.load(self.faq_dir)
+        except Exception as e:
+            logging.error(f"FAQ store error: {e}")
+            return None
+        if store.model_name != EMBEDDING_MODEL:
+            logging.error(f"FAQ store was built with {store.model_name}, not {EMBEDDING_MODEL}; rebuild it with build_faq.py")
+            return None
+        print(f"Loaded FAQ store built at {store.built_at}")
+        return store
+
+    @property
+    def quantized_dir(self) -> Path:
+        return Path(self.persist_dir) / QUANTIZED_DIRNAME
+
+    def _quantized_options(self) -> dict:
+        return {
+            "dtype": QUANTIZED_DTYPE,
+            "rescore": QUANTIZED_RESCORE,
+            "n_lists": QUANTIZED_IVF_LISTS,
+            "nprobe": QUANTIZED_IVF_PROBES,
+        }
+
+    def _open_quantized(self):
+        from quantstore import QuantizedVectorStore
+        if QuantizedVectorStore.exists(self.quantized_dir):
+            print("Loaded existing quantized vector store")
+            return QuantizedVectorStore(self.quantized_dir, self.embeddings, **self._quantized_options())
+        if (Path(self.persist_dir) / "chroma.sqlite3").exists():
+            from langchain_chroma import Chroma
+            print("Converting Chroma store → quantized vector store")
+            chroma = Chroma(persist_directory=self.persist_dir, embedding_function=self.embeddings)
+            return QuantizedVectorStore.from_collection(
+                chroma._collection, self.quantized_dir, self.embeddings, **self._quantized_options()
+            )
+        print("Vector DB not found → creating new one")
+        return self.rebuild_vectordb(self.seed_documents)
+
+    def _open_vectordb(self):
+        if VECTOR_STORE == "quantized":
+            return self._open_quantized()
+        from langchain_chroma import Chroma
+        if Path(self.persist_dir).exists() and any(Path(self.persist_dir).iterdir()):
+            try:
+                vectordb = Chroma(persist_directory=self.persist_dir, embedding_function=self.embeddings)
+                print("Loaded existing vector database")
+                return vectordb
+            except Exception as e:
+                print(f"Error loading DB: {e}")
+        else:
+            print("Vector DB not found → creating new one")
+        return self.rebuild_vectordb(self.seed_documents)
+
+    def rebuild_vectordb(self, texts):
+        if VECTOR_STORE == "quantized":
+            from quantstore import QuantizedVectorStore
+            vectordb = QuantizedVectorStore.from_texts(
+                list(texts), self.embeddings, directory=self.quantized_dir, **self._quantized_options()
+            )
+        elif texts:
+            from langchain_chroma import Chroma
+            vectordb = Chroma.from_texts(texts=list(texts), embedding=self.embeddings, persist_directory=self.persist_dir)
+        else:
+            from langchain_chroma import Chroma
+            vectordb = Chroma(persist_directory=self.persist_dir, embedding_function=self.embeddings)
+        with self._lock:
+            self._vectordb = vectordb
+            self._retriever = None
+            if HYBRID_RETRIEVAL:
+                self.rebuild_lexical_index()
+        answer_cache.clear()
+        return vectordb
+
+    def preload(self):
+        """
+        Loads the embedding model weights and tokenizer without running them.
+        Safe to call in a parent process before forking workers: the LLM
+        clients (with their connection pools) and the SQLite embedding cache
+        are only opened later, in each worker.
+        """
+        self.embeddings.base
+
+    def _backing_off(self) -> bool:
+        failed_at = self.warmup_failed_at
+        return failed_at is not None and time.monotonic() - failed_at < RAG_WARMUP_RETRY
+
+    def warm_up(self, retry: bool = True):
+        """
+        Loads everything and runs one embedding so the first request is fast.
+        Errors are logged and kept in warmup_error rather than raised. Each
+        resource is kept once it has loaded, so a retry only redoes the stages
+        that failed. With retry=False nothing is done for RAG_WARMUP_RETRY
+        seconds after a failure.
+        """
+        with self._warmup_lock:
+            if self.ready or (not retry and self._backing_off()):
+                return
+            try:
+                self.preload()
+                if isinstance(self.llm, LLMGateway):
+                    self.llm.preload()
+                self.vectordb
+                self.lexical_index
+                self.faq_store
+                self.embeddings.embed_query("warm up")
+                self.warmup_error = None
+                self.warmup_failed_at = None
+                self.ready = True
+            except Exception as e:
+                logging.error(f"RAG warm-up error: {e}")
+                self.warmup_error = str(e)
+                self.warmup_failed_at = time.monotonic()
+
+    async def ensure_ready(self):
+        """
+        Finishes loading off the event loop if a request arrives before warm-up
+        did. After a failed warm-up, requests retry it at most every
+        RAG_WARMUP_RETRY seconds and otherwise go straight on to the
+        per-stage error handling.
+        """
+        if not self.ready and not self._backing_off():
+            await asyncio.to_thread(self.warm_up, False)
+
+    async def resource(self, name: str):
+        """
+        The lazily built attribute `name` (e.g. "faq_store"), for coroutines.
+        Until warm-up has finished it is read on a worker thread, since
+        building it, or waiting for the lock warm-up holds, would otherwise
+        block the event loop.
+        """
+        if self.ready:
+            return getattr(self, name)
+        return await asyncio.to_thread(getattr, self, name)
+
+def build_llm_gateway() -> LLMGateway:
+    from langchain.chat_models import init_chat_model
+
+    tiers = [("primary", lambda: init_chat_model(LLM_MODEL, model_provider="google_genai"))]
+    if LLM_FALLBACK_MODEL:
+        tiers.append(("fallback", lambda: init_chat_model(LLM_FALLBACK_MODEL, model_provider="google_genai")))
+    return LLMGateway(
+        tiers,
+        timeout=LLM_TIMEOUT,
+        first_token_timeout=LLM_FIRST_TOKEN_TIMEOUT,
+        deadline=LLM_DEADLINE,
+        max_retries=LLM_MAX_RETRIES,
+        hedge=LLM_HEDGE,
+        hedge_budget=LLM_HEDGE_BUDGET,
+        breaker_failures=LLM_BREAKER_FAILURES,
+        breaker_reset=LLM_BREAKER_RESET,
+    )
+
+# ---- Async plumbing ---- #
+embed_executor = ThreadPoolExecutor(max_workers=EMBED_WORKERS, thread_name_prefix="embed")
+rag_semaphore = asyncio.Semaphore(RAG_MAX_CONCURRENCY)
+
+rag_engine = RAGEngine()
+context_compressor = ContextCompressor(
+    k=RETRIEVER_K,
+    max_tokens=CONTEXT_MAX_TOKENS,
+    duplicate_threshold=CONTEXT_DUPLICATE_THRESHOLD,
+    diversity=CONTEXT_DIVERSITY,
+)
+# Identical questions asked while an answer is being generated wait for that answer.
+answer_flights = SingleFlight(timeout=RAG_FLIGHT_TIMEOUT)
+
+FAQ_ROUTES = registry.counter(
+    "faq_routes_total",
+    "Questions answered from the FAQ store (exact or semantic match) or passed on to RAG (miss).",
+    labels=("outcome",),
+)
+
+registry.gauge_callback("answer_cache", "Semantic answer cache size and hit/miss counts.", "stat", answer_cache.stats)
+registry.gauge_callback("answer_flights", "Coalesced answer generation: leader calls and calls saved.", "stat", answer_flights.stats)
+registry.gauge_callback(
+    "embedding_cache",
+    "Query embedding cache size and hit/miss counts.",
+    "stat",
+    lambda: rag_engine._embeddings.stats() if rag_engine._embeddings is not None else {},
+)
+registry.gauge_callback(
+    "llm_gateway",
+    "LLM calls and hedges sent, and which tiers have an open circuit breaker.",
+    "stat",
+    lambda: rag_engine._llm.stats() if isinstance(rag_engine._llm, LLMGateway) else {},
+)
+
+registry.gauge_callback(
+    "faq_store",
+    "Intents and example questions in the loaded FAQ store.",
+    "stat",
+    lambda: rag_engine._faq_store.stats() if rag_engine._faq_store is not None else {},
+)
 
 # ---- Helper Functions ---- #
 def build_context(snippets):
@@ -92,7 +465,7 @@ def build_context(snippets):
 
 def retrieval(q):
     try:
-        results = retriever.get_relevant_documents(q)
+        results = rag_engine.retriever.get_relevant_documents(q)
         snippets = [d.page_content for d in results]
         
     except Exception as e:
@@ -100,9 +473,15 @@ def retrieval(q):
         snippets = []
     return snippets
 
-def augmentation(question,snippets):
+def augmentation(question, snippets, history=""):
     context = build_context(snippets)
-    if question.lower().strip() in ["hi", "hello", "hey", "hi there"]:
+    conversation = ""
+    if history:
+        conversation = f"""
+Conversation so far (use it to understand follow-up questions):
+{history}
+"""
+    if normalize_question(question) in GREETINGS:
         prompt = f"""You are a legal expert assistant for a Justice Department chatbot.
 Respond to this greeting briefly and welcomingly.
 
@@ -124,6 +503,7 @@ IMPORTANT FORMATTING INSTRUCTIONS:
 - Keep information concise and easily scannable
 - Add line breaks between sections
 
+{conversation}
 Context information:
 {context}
 
@@ -151,45 +531,275 @@ IV. ADDITIONAL RESOURCES:
 
 Provide a comprehensive yet easily digestible response with proper line breaks.
 """
-        return prompt
-def generation(prompt: str) -> str:
+    return prompt
+
+def extractive_answer(snippets) -> str:
+    """Answer built from the top retrieved passages, for when no model tier can answer."""
+    if not EXTRACTIVE_FALLBACK or not snippets:
+        return LLM_ERROR_MESSAGE
+    points = "\n".join(f"• {truncate_tokens(snippet, 120)}" for snippet in snippets[:EXTRACTIVE_SNIPPETS])
+    return f"I. <strong>RELEVANT INFORMATION</strong>\n{points}\nII. NOTE\n• {EXTRACTIVE_NOTE}"
+
+def generation(prompt: str, snippets=()) -> str:
     """
     Generates a response from the LLM and applies robust formatting.
     """
     try:
-        resp = llm.invoke(prompt)
-        content = resp.content
-
-        # 1. Convert markdown bold to HTML strong tags reliably
-        # This pattern finds text wrapped in **...** and replaces the tags correctly.
-        formatted_response = re.sub(r'\*\*(.*?)\*\*', r'<strong>\1</strong>', content)
-
-        # 2. Ensure any numbered list item starts on a new line
-        # This finds any number (e.g., "1.", "10.") and ensures a newline is before it.
-        formatted_response = re.sub(r'(\d+\.)\s*', r'\n\1 ', formatted_response)
-
-        # 3. Ensure any bullet point starts on a new line
-        # This finds a bullet (•) and ensures a newline is before it.
-        formatted_response = re.sub(r'(•)\s*', r'\n\1 ', formatted_response)
-        
-        # 4. A simple way to add line breaks after sentences
-        formatted_response = formatted_response.replace(". ", ".\n")
-
-        # 5. Clean up any excess blank lines created by the formatting
-        # This replaces multiple newlines with a single one.
-        formatted_response = re.sub(r'\n\s*\n', '\n', formatted_response).strip()
-        
-        return formatted_response
+        resp = rag_engine.llm.invoke(prompt)
+        return format_response(resp.content)
         
     except Exception as e:
         logging.error(f"LLM Generation error: {e}")
-        return "I apologize, but I am currently unable to process your request. Please try again later."
+        return extractive_answer(snippets)
     
 def RAG(q: str) -> str:
     retrieved_documents = retrieval(q)
     
     prompt = augmentation(q, retrieved_documents)
     
-    answer = generation(prompt)
+    answer = generation(prompt, retrieved_documents)
     
-    return answer
\ No newline at end of file
+    return answer
+
+# ---- Async pipeline ---- #
+async def aembed_query(q):
+    batcher = await rag_engine.resource("query_batcher")
+    with stage_timer("embedding"):
+        return await batcher.embed(q)
+
+async def _snippet_vectors(snippets, known):
+    """Embeddings for snippets, reusing `known` (text -> stored vector) and embedding the rest."""
+    missing = [snippet for snippet in dict.fromkeys(snippets) if snippet not in known]
+    if missing:
+        loop = asyncio.get_running_loop()
+        embedded = await loop.run_in_executor(embed_executor, rag_engine.embeddings.embed_array, missing)
+        known = {**known, **dict(zip(missing, embedded))}
+    return np.stack([np.asarray(known[snippet], dtype=np.float32) for snippet in snippets])
+
+async def aretrieval(q, query_vector=None):
+    """
+    Non-blocking retrieval: the query is embedded on the embedding pool and
+    the vector search runs off the event loop. Pass `query_vector` to reuse
+    an embedding that has already been computed.
+
+    With hybrid retrieval on, vector hits are fused with BM25 hits by
+    reciprocal rank, and short keyword queries are answered from the
+    BM25 index alone without embedding. With context compression on, more
+    candidates are fetched and ContextCompressor picks the snippets to
+    keep, using the embeddings stored alongside the vector hits.
+    """
+    fetch_k = RETRIEVER_FETCH_K if CONTEXT_COMPRESSION else RETRIEVER_K
+    try:
+        index = await rag_engine.resource("lexical_index")
+        collection = await rag_engine.resource("collection")
+        if query_vector is None and rag_engine.is_keyword_query(q):
+            with stage_timer("lexical_search"):
+                snippets = await asyncio.to_thread(rag_engine.lexical_search, q, fetch_k)
+            if CONTEXT_COMPRESSION:
+                with stage_timer("context_compression"):
+                    snippets = context_compressor.compress(q, snippets)
+            return snippets
+
+        if query_vector is None:
+            query_vector = await aembed_query(q)
+        with stage_timer("vector_search"):
+            found = await asyncio.to_thread(
+                collection.query,
+                query_embeddings=[list(map(float, query_vector))],
+                n_results=fetch_k,
+                include=["documents", "embeddings"] if CONTEXT_COMPRESSION else ["documents"],
+            )
+        snippets = list(found["documents"][0])
+        if index is not None:
+            with stage_timer("lexical_search"):
+                lexical_snippets = await asyncio.to_thread(rag_engine.lexical_search, q, fetch_k)
+            snippets = reciprocal_rank_fusion(snippets, lexical_snippets)[:fetch_k]
+        if not CONTEXT_COMPRESSION:
+            return snippets
+
+        stored = dict(zip(found["documents"][0], found["embeddings"][0]))
+        vectors = await _snippet_vectors(snippets, stored) if snippets else None
+        with stage_timer("context_compression"):
+            snippets = context_compressor.compress(q, snippets, query_vector, vectors)
+
+    except Exception as e:
+        logging.error(f"Retriever error: {e}")
+        snippets = []
+    return snippets
+
+async def acached_answer(q):
+    """
+    Looks the question up in the answer cache. Returns (answer, query_vector);
+    answer is None on a miss, query_vector is None on an exact hit, for
+    keyword queries (which are never embedded) or when embedding failed.
+    """
+    answer = answer_cache.get_exact(q)
+    if answer is not None:
+        return answer, None
+    await rag_engine.resource("lexical_index")
+    if rag_engine.is_keyword_query(q):
+        return answer, None
+    try:
+        query_vector = await aembed_query(q)
+    except Exception as e:
+        logging.error(f"Embedding error: {e}")
+        return None, None
+    return answer_cache.get_similar(query_vector), query_vector
+
+async def afaq_answers(q: str, history: str = ""):
+    """
+    Routes a question to a precomputed FAQ answer. Returns the intent's
+    answers by language code, or None to run the RAG pipeline. Examples
+    match exactly without embedding; other questions are embedded and
+    compared with every example at once, except keyword queries, which
+    are never embedded. Follow-ups (with `history`) are not routed.
+    """
+    if history:
+        return None
+    store = await rag_engine.resource("faq_store")
+    if store is None:
+        return None
+    answers = store.lookup(q)
+    if answers is not None:
+        FAQ_ROUTES.inc(outcome="exact")
+        return answers
+    await rag_engine.ensure_ready()
+    await rag_engine.resource("lexical_index")
+    if not rag_engine.is_keyword_query(q):
+        try:
+            query_vector = await aembed_query(q)
+        except Exception as e:
+            logging.error(f"Embedding error: {e}")
+            return None
+        with stage_timer("faq_routing"):
+            answers = store.match(query_vector, FAQ_THRESHOLD)
+    FAQ_ROUTES.inc(outcome="miss" if answers is None else "semantic")
+    return answers
+
+def remember_answer(q, query_vector, answer):
+    if LLM_ERROR_MESSAGE not in answer and EXTRACTIVE_NOTE not in answer:
+        answer_cache.put(q, query_vector, answer)
+
+async def agenerate(prompt: str, snippets=()) -> str:
+    """
+    Async counterpart of generation(); awaits the LLM instead of blocking on it.
+    """
+    try:
+        with stage_timer("llm_call"):
+            resp = await rag_engine.llm.ainvoke(prompt)
+        with stage_timer("formatting"):
+            return format_response(resp.content)
+
+    except Exception as e:
+        logging.error(f"LLM Generation error: {e}")
+        return extractive_answer(snippets)
+
+async def astream_generation(prompt: str, snippets=()):
+    """
+    Streams the LLM answer as formatted pieces while tokens arrive. If the
+    model fails before anything was sent, the extractive answer is sent
+    instead; a failure mid-answer can only be reported.
+    """
+    formatter = ResponseFormatter()
+    start = time.perf_counter()
+    first_token = True
+    sent = False
+    try:
+        # llm_call spans the whole stream: model time plus incremental
+        # formatting. The single-flight pump reads the stream without
+        # waiting for clients, so slow readers are not counted, except for
+        # follow-ups (with history), which bypass the pump and are read
+        # by their client directly.
+        with stage_timer("llm_call"):
+            async for chunk in rag_engine.llm.astream(prompt):
+                if first_token:
+                    STAGE_SECONDS.observe(time.perf_counter() - start, stage="llm_first_token")
+                    first_token = False
+                piece = formatter.feed(chunk.content)
+                if piece:
+                    sent = True
+                    yield piece
+        tail = formatter.flush()
+        if tail:
+            yield tail
+
+    except Exception as e:
+        logging.error(f"LLM Generation error: {e}")
+        yield LLM_ERROR_MESSAGE if sent else extractive_answer(snippets)
+
+async def _lookup(q: str, history: str):
+    await rag_engine.ensure_ready()
+    if history:
+        # Answers to follow-ups depend on the conversation, so they are neither reused nor cached.
+        return None, None
+    return await acached_answer(q)
+
+def _remember(q, query_vector, answer, history: str):
+    if not history:
+        remember_answer(q, query_vector, answer)
+
+async def _answer(q: str, history: str = "", retrieval_query: str = None):
+    cached, query_vector = await _lookup(q, history)
+    if cached is not None:
+        yield cached
+        return
+
+    async with rag_semaphore:
+        retrieved_documents = await aretrieval(retrieval_query or q, None if retrieval_query else query_vector)
+
+        with stage_timer("prompt_build"):
+            prompt = augmentation(q, retrieved_documents, history)
+
+        answer = await agenerate(prompt, retrieved_documents)
+
+    _remember(q, query_vector, answer, history)
+    yield answer
+
+async def _astream_answer(q: str, history: str = "", retrieval_query: str = None):
+    cached, query_vector = await _lookup(q, history)
+    if cached is not None:
+        yield cached
+        return
+
+    pieces = []
+    async with rag_semaphore:
+        retrieved_documents = await aretrieval(retrieval_query or q, None if retrieval_query else query_vector)
+
+        with stage_timer("prompt_build"):
+            prompt = augmentation(q, retrieved_documents, history)
+
+        async for piece in astream_generation(prompt, retrieved_documents):
+            pieces.append(piece)
+            yield piece
+
+    _remember(q, query_vector, "".join(pieces), history)
+
+async def ARAG(q: str, history: str = "", retrieval_query: str = None) -> str:
+    """
+    Answers a question. Concurrent identical questions (after normalisation)
+    share one pipeline run, whether it was started here or by astream_RAG.
+    With conversation `history` the question is answered on its own, and
+    `retrieval_query` (e.g. the previous question plus this one) can stand
+    in for it when searching the knowledge base.
+    """
+    if history:
+        return "".join([piece async for piece in _answer(q, history, retrieval_query)])
+    try:
+        pieces = [piece async for piece in answer_flights.stream(answer_cache.normalize(q), lambda: _answer(q))]
+    except asyncio.TimeoutError:
+        logging.error(f"RAG timed out after {answer_flights.timeout}s")
+        return LLM_ERROR_MESSAGE
+    return "".join(pieces)
+
+async def astream_RAG(q: str, history: str = "", retrieval_query: str = None):
+    """Streaming ARAG; a duplicate that joins late first receives the pieces already produced."""
+    if history:
+        async for piece in _astream_answer(q, history, retrieval_query):
+            yield piece
+        return
+    try:
+        async for piece in answer_flights.stream(answer_cache.normalize(q), lambda: _astream_answer(q)):
+            yield piece
+    except asyncio.TimeoutError:
+        logging.error(f"RAG timed out after {answer_flights.timeout}s")
+        yield LLM_ERROR_MESSAGE
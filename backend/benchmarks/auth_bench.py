@@ -0,0 +1,92 @@
+"""
+Login storm benchmark.
+
+Fires concurrent /token requests at the in-process app while a probe task
+measures event-loop lag (how late a 10 ms sleep wakes up), then times a
+burst of authenticated requests to show the principal cache at work. Run
+with --on-loop to hash on the event loop as the app used to, for
+comparison.
+
+    cd backend && python benchmarks/auth_bench.py --logins 40 --concurrency 20
+    python benchmarks/auth_bench.py --logins 40 --concurrency 20 --on-loop
+"""
+from pathlib import Path
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+WORKDIR = Path(tempfile.mkdtemp(prefix="justice-auth-bench-"))
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{WORKDIR / 'bench.db'}")
+os.environ.setdefault("RAG_WARMUP", "0")
+os.environ.setdefault("RAG_PRELOAD", "0")
+os.environ.setdefault("TRANSLATION_BACKEND", "local")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from load_bench import drive, summarize
+
+import httpx
+
+import main
+
+
+async def probe_loop_lag(stop: asyncio.Event, interval: float = 0.01):
+    """Collects how much later than requested each sleep(interval) returns."""
+    lags = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(max(0.0, time.perf_counter() - start - interval))
+    return lags
+
+
+async def run(args):
+    if args.on_loop:
+        async def verify_on_loop(plain, hashed):
+            return main.verify_password(plain, hashed)
+        main.averify_password = verify_on_loop
+
+    transport = httpx.ASGITransport(app=main.app)
+    results = {}
+    async with main.app.router.lifespan_context(main.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            credentials = {"username": "storm-user", "password": "storm-password"}
+            await client.post("/register", json=credentials)
+
+            stop = asyncio.Event()
+            probe = asyncio.create_task(probe_loop_lag(stop))
+            results["token"] = await drive(lambda i: client.post("/token", data=credentials), args.logins, args.concurrency)
+            stop.set()
+            lags = await probe
+            results["loop_lag"] = summarize(lags, sum(lags) or 1.0)
+            results["loop_lag"]["max_ms"] = max(lags) * 1000 if lags else 0.0
+
+            token = (await client.post("/token", data=credentials)).json()["access_token"]
+            headers = {"Authorization": f"Bearer {token}"}
+            results["authenticated"] = await drive(lambda i: client.get("/sessions", headers=headers), args.requests, args.concurrency)
+            results["principal_cache"] = main.principal_cache.hits, main.principal_cache.misses
+    return results
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--requests", type=int, default=200, help="Authenticated requests after the storm")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--on-loop", action="store_true", help="Verify passwords on the event loop (old behaviour)")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    token, lag, authed = results["token"], results["loop_lag"], results["authenticated"]
+    print(f"bcrypt {'on the event loop' if args.on_loop else f'on {main.AUTH_HASH_WORKERS} pool threads'}")
+    print(f"  logins         {token['requests']:>5}  {token['rps']:.1f}/s  p50 {token['p50_ms']:.0f} ms  p95 {token['p95_ms']:.0f} ms  errors {token['errors']}")
+    print(f"  loop lag       {lag['requests']:>5} probes  p50 {lag['p50_ms']:.1f} ms  p99 {lag['p99_ms']:.1f} ms  max {lag['max_ms']:.1f} ms")
+    print(f"  authenticated  {authed['requests']:>5}  {authed['rps']:.1f}/s  p50 {authed['p50_ms']:.1f} ms  p95 {authed['p95_ms']:.1f} ms")
+    hits, misses = results["principal_cache"]
+    print(f"  principal cache hits {hits}, misses {misses}")
+
+
+if __name__ == "__main__":
+    main_cli()
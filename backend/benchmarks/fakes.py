@@ -0,0 +1,134 @@
+"""
+Offline stand-ins for the networked parts of the stack, so benchmarks run
+without a Gemini key or a model download. Translation uses
+translation.LocalBackend.
+"""
+from types import SimpleNamespace
+import asyncio
+import hashlib
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from langchain_core.embeddings import Embeddings
+
+FAKE_ANSWER = (
+    "I. **Filing a Complaint**\n"
+    "• Visit the nearest police station. • Describe the incident clearly. • Ask for an acknowledgment.\n"
+    "II. Steps to Follow\n"
+    "1. Write down the facts. 2. Submit the written complaint. 3. Collect a copy of the FIR.\n"
+    "III. KEY POINTS TO REMEMBER:\n"
+    "• The police must register your complaint. • You can approach the Superintendent of Police if refused.\n"
+    "IV. ADDITIONAL RESOURCES:\n"
+    "- Contact the District Legal Services Authority for free legal aid."
+)
+
+
+class FakeChatModel:
+    """
+    Chat model with a fixed answer, a fixed time to first token and a steady
+    token rate. Exposes the invoke/ainvoke/astream surface the app uses.
+
+    Faults can be injected to mimic a real provider: `failure_rate` of calls
+    raise after the first-token latency, and `slow_rate` of calls wait an
+    extra `slow_latency` seconds first (the latency tail).
+    """
+
+    def __init__(self, latency: float = 0.2, tokens_per_second: float = 200.0, answer: str = FAKE_ANSWER,
+                 failure_rate: float = 0.0, slow_rate: float = 0.0, slow_latency: float = 0.0, seed=None):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.tokens = re.findall(r"\S+\s*", answer)
+        self.answer = answer
+        self.failure_rate = failure_rate
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self._random = random.Random(seed)
+        self.calls = 0
+        self.failures = 0
+
+    def _total_time(self) -> float:
+        return self.latency + len(self.tokens) / self.tokens_per_second
+
+    def _fault(self):
+        """Returns (extra delay, fail?) for one call."""
+        self.calls += 1
+        delay = self.slow_latency if self._random.random() < self.slow_rate else 0.0
+        fail = self._random.random() < self.failure_rate
+        self.failures += fail
+        return delay, fail
+
+    def invoke(self, prompt, **kwargs):
+        delay, fail = self._fault()
+        time.sleep(delay + (self.latency if fail else self._total_time()))
+        if fail:
+            raise RuntimeError("injected model failure")
+        return SimpleNamespace(content=self.answer)
+
+    async def ainvoke(self, prompt, **kwargs):
+        delay, fail = self._fault()
+        await asyncio.sleep(delay + (self.latency if fail else self._total_time()))
+        if fail:
+            raise RuntimeError("injected model failure")
+        return SimpleNamespace(content=self.answer)
+
+    async def astream(self, prompt, **kwargs):
+        delay, fail = self._fault()
+        await asyncio.sleep(delay + self.latency)
+        if fail:
+            raise RuntimeError("injected model failure")
+        for token in self.tokens:
+            await asyncio.sleep(1 / self.tokens_per_second)
+            yield SimpleNamespace(content=token)
+
+
+class FakeEmbeddings(Embeddings):
+    """
+    Deterministic hashed bag-of-words vectors: texts sharing words get similar
+    vectors, which is enough to exercise retrieval and caching realistically.
+    """
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def _embed(self, text: str):
+        vector = [0.0] * self.dim
+        for token in re.findall(r"\w+", text.lower()):
+            digest = hashlib.md5(token.encode("utf-8")).digest()
+            index = int.from_bytes(digest[:4], "little") % self.dim
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+        norm = sum(v * v for v in vector) ** 0.5 or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+def install_fakes(rag_engine, persist_dir, llm=None, embeddings=None):
+    """
+    Points a RAGEngine at fake LLM/embedding backends. The vector store is
+    built from them in `persist_dir` the first time it is needed.
+    """
+    from RAG import EMBEDDING_MODEL
+    from embedding import CachedEmbeddings
+
+    rag_engine.persist_dir = str(persist_dir)
+    rag_engine._llm = llm or FakeChatModel()
+    rag_engine._embeddings = CachedEmbeddings(embeddings or FakeEmbeddings(), model_name=EMBEDDING_MODEL)
+    rag_engine._vectordb = None
+    rag_engine._retriever = None
+    rag_engine._query_batcher = None
+    rag_engine._lexical_index = None
+    rag_engine._faq_store = None
+    rag_engine._faq_checked = False
+    rag_engine.ready = False
+    rag_engine.warmup_failed_at = None
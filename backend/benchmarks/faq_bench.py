@@ -0,0 +1,131 @@
+"""
+FAQ routing benchmark: latency of answering stock questions from the FAQ
+store versus the full RAG pipeline, and the cost routing adds to
+questions it does not match.
+
+Builds a store with build_faq.build_store against fake embeddings, a fake
+chat model and the local translator in a temporary directory, then times:
+
+- exact: an example question (no embedding);
+- semantic: reworded questions matched through the FAQ matrix;
+- miss: questions that match no intent (the overhead RAG requests pay);
+- rag: the same reworded questions answered by ARAG with the cache cleared;
+- match: one FAQStore.match() call against matrices of growing size.
+
+The fake embeddings are hashed bags of words, so the similarity threshold
+is lowered by default; with the real model use RAG.FAQ_THRESHOLD. Repeated
+questions are embedded once and then come from the embedding cache, so
+the semantic and miss rows show routing cost, not model time.
+
+    cd backend && python benchmarks/faq_bench.py --repeat 50 --llm-latency 1.5
+"""
+from pathlib import Path
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+WORKDIR = Path(tempfile.mkdtemp(prefix="justice-faq-bench-"))
+os.environ.setdefault("RAG_PRELOAD", "0")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from fakes import FakeChatModel, install_fakes
+
+import RAG
+from build_faq import build_store
+from faq import FAQ_INTENTS, FAQStore
+from translation import LocalBackend, TranslationService
+
+REWORDED = [
+    "how can i file an FIR at the police station",
+    "what do i do if police refuse to register my complaint",
+    "how to file an RTI application online",
+    "how do i get free legal aid",
+    "can i appeal against a court decision",
+    "what rights do i have if the police arrest me",
+]
+UNMATCHED = [
+    "Is a verbal agreement legally binding for renting a flat?",
+    "What is the punishment for cheque bounce under the law?",
+    "How long does a divorce by mutual consent take?",
+]
+
+
+def percentiles(timings):
+    ordered = sorted(timings)
+    return [ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))] * 1000 for p in (50, 95)]
+
+
+async def time_questions(answer, questions, repeat: int):
+    """Returns (latencies, hits) over `repeat` passes through `questions`."""
+    timings, hits = [], 0
+    for _ in range(repeat):
+        for question in questions:
+            start = time.perf_counter()
+            hits += await answer(question) is not None
+            timings.append(time.perf_counter() - start)
+    return timings, hits
+
+
+async def rag_answer(question):
+    RAG.answer_cache.clear()
+    return await RAG.ARAG(question)
+
+
+def match_timings(dim: int, repeat: int):
+    rng = np.random.default_rng(0)
+    rows = []
+    for n in (50, 1000, 10000):
+        store = FAQStore([{"id": "x", "answers": {}}], [""] * n, [0] * n, rng.standard_normal((n, dim)), "bench")
+        query = rng.standard_normal(dim)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            store.match(query, 1.0)
+        rows.append((n, (time.perf_counter() - start) / repeat * 1e6))
+    return rows
+
+
+async def main(args):
+    install_fakes(RAG.rag_engine, WORKDIR / "chroma", llm=FakeChatModel(args.llm_latency, args.llm_token_rate))
+    RAG.FAQ_THRESHOLD = args.threshold
+    translator = TranslationService(LocalBackend())
+    store = await build_store(translator, ["hi", "ta"])
+    store.save(RAG.rag_engine.faq_dir)
+    RAG.rag_engine._faq_checked = False
+    stats = store.stats()
+    print(f"FAQ store: {stats['intents']} intents, {stats['questions']} example questions, threshold {args.threshold}")
+
+    examples = [intent["questions"][0] for intent in FAQ_INTENTS]
+    scenarios = [
+        ("exact", RAG.afaq_answers, examples),
+        ("semantic", RAG.afaq_answers, REWORDED),
+        ("miss", RAG.afaq_answers, UNMATCHED),
+        ("rag", rag_answer, REWORDED),
+    ]
+    print(f"\n  {'path':<10}{'p50 ms':>10}{'p95 ms':>10}{'answered':>11}")
+    for name, answer, questions in scenarios:
+        repeat = max(1, args.repeat // 10) if name == "rag" else args.repeat
+        timings, hits = await time_questions(answer, questions, repeat)
+        p50, p95 = percentiles(timings)
+        print(f"  {name:<10}{p50:>10.3f}{p95:>10.3f}{f'{hits}/{len(timings)}':>11}")
+
+    print(f"\n  {'FAQ rows':<10}{'match us':>10}")
+    for n, micros in match_timings(len(store.vectors[0]), args.repeat * 10):
+        print(f"  {n:<10}{micros:>10.1f}")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--threshold", type=float, default=0.6, help="Similarity threshold (fake embeddings score lower than the real model)")
+    parser.add_argument("--llm-latency", type=float, default=1.5, help="Fake model time to first token (s)")
+    parser.add_argument("--llm-token-rate", type=float, default=200.0)
+    asyncio.run(main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main_cli()
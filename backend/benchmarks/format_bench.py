@@ -0,0 +1,111 @@
+"""
+Response formatter benchmark.
+
+Times formatting.format_response / ResponseFormatter against the chained
+re.sub implementation they replaced (kept below as `legacy_*`; the tests
+in tests/test_formatting.py also compare against it), whole and streamed,
+on answers of growing length. Output checks live in the tests.
+
+    cd backend && python benchmarks/format_bench.py --repeat 200
+"""
+from pathlib import Path
+import argparse
+import re
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from fakes import FAKE_ANSWER
+
+from formatting import ResponseFormatter, format_response
+
+
+# ---- Previous implementation (RAG.py before the formatting module) ---- #
+def _legacy_rules(content: str) -> str:
+    text = re.sub(r'\*\*(.*?)\*\*', r'<strong>\1</strong>', content)
+    text = re.sub(r'(\d+\.)\s*', r'\n\1 ', text)
+    text = re.sub(r'(•)\s*', r'\n\1 ', text)
+    return text.replace(". ", ".\n")
+
+
+def _legacy_collapse(text: str) -> str:
+    return re.sub(r'\n\s*\n', '\n', text)
+
+
+def legacy_format_response(content: str) -> str:
+    return _legacy_collapse(_legacy_rules(content)).strip()
+
+
+class LegacyStreamFormatter:
+    def __init__(self):
+        self._pending = ""
+        self._held = ""
+        self._started = False
+
+    def _safe_cut(self) -> int:
+        for i in range(len(self._pending) - 1, -1, -1):
+            if self._pending[i].isspace() and self._pending[:i].count("**") % 2 == 0:
+                return i + 1
+        return 0
+
+    def _emit(self, piece: str, final: bool = False) -> str:
+        text = _legacy_collapse(self._held + _legacy_rules(piece))
+        if not self._started:
+            text = text.lstrip()
+        stripped = text.rstrip()
+        self._held = "" if final else text[len(stripped):]
+        if stripped:
+            self._started = True
+        return stripped
+
+    def feed(self, chunk: str) -> str:
+        self._pending += chunk
+        cut = self._safe_cut()
+        if cut == 0:
+            return ""
+        piece, self._pending = self._pending[:cut], self._pending[cut:]
+        return self._emit(piece)
+
+    def flush(self) -> str:
+        piece, self._pending = self._pending, ""
+        return self._emit(piece, final=True)
+
+
+def stream(formatter, pieces) -> str:
+    return "".join(formatter.feed(piece) for piece in pieces) + formatter.flush()
+
+
+# ---- Timing ---- #
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def bench(repeat: int):
+    print(f"  {'answer':<16}{'legacy ms':>11}{'new ms':>9}{'stream legacy':>15}{'stream new':>12}")
+    for copies in (1, 4, 16, 64):
+        answer = "\n".join([FAKE_ANSWER] * copies)
+        tokens = re.findall(r"\S+\s*", answer)
+        timings = (
+            best_of(lambda: legacy_format_response(answer), repeat),
+            best_of(lambda: format_response(answer), repeat),
+            best_of(lambda: stream(LegacyStreamFormatter(), tokens), max(1, repeat // 10)),
+            best_of(lambda: stream(ResponseFormatter(), tokens), max(1, repeat // 10)),
+        )
+        print(f"  {f'{len(answer)} chars':<16}" + "".join(f"{t:>{w}.3f}" for t, w in zip(timings, (11, 9, 15, 12))))
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200, help="Timing repetitions (best run is reported)")
+    args = parser.parse_args()
+
+    bench(args.repeat)
+
+
+if __name__ == "__main__":
+    main_cli()
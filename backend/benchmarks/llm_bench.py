@@ -0,0 +1,118 @@
+"""
+LLM gateway benchmark: tail latency and error rate with and without
+llm_gateway.LLMGateway, against fake models with injected faults.
+
+Each scenario sends the same requests at a fixed concurrency straight to
+the primary fake model ("direct") and through the gateway (deadlines,
+hedging, retries, circuit breaker, fallback tier). Reports p50/p95/p99
+latency, the error rate and how many model calls were made, so the cost
+of hedging and retries is visible next to what they buy.
+
+    cd backend && python benchmarks/llm_bench.py --requests 400 --concurrency 16
+    python benchmarks/llm_bench.py --stream   # time to first token on streamed answers
+"""
+from pathlib import Path
+import argparse
+import asyncio
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from fakes import FakeChatModel
+
+from llm_gateway import LLMGateway
+
+SCENARIOS = {
+    # name: (primary faults, fallback faults)
+    "healthy": ({}, {}),
+    "slow tail (5% +2s)": ({"slow_rate": 0.05, "slow_latency": 2.0}, {}),
+    "flaky (5% errors)": ({"failure_rate": 0.05}, {}),
+    "outage (primary down)": ({"failure_rate": 1.0}, {}),
+}
+
+
+def percentile(ordered, p):
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))] * 1000
+
+
+async def drive(call, requests: int, concurrency: int):
+    """Runs `requests` calls at `concurrency`; returns (latencies of successes, error count)."""
+    latencies, errors = [], 0
+    queue = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in queue:
+            start = time.perf_counter()
+            try:
+                await call()
+                latencies.append(time.perf_counter() - start)
+            except Exception:
+                errors += 1
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors
+
+
+def stream_call(model, first_token_only: bool):
+    async def call():
+        stream = model.astream("prompt")
+        try:
+            async for _ in stream:
+                if first_token_only:
+                    break
+        finally:
+            await stream.aclose()
+    return call
+
+
+async def run_scenario(name, primary_faults, fallback_faults, args):
+    def model(faults, seed, latency):
+        return FakeChatModel(latency=latency, tokens_per_second=args.tokens_per_second, seed=seed, **faults)
+
+    rows = []
+    for mode in ("direct", "gateway"):
+        primary = model(primary_faults, args.seed, args.latency)
+        fallback = model(fallback_faults, args.seed + 1, args.latency / 2)
+        if mode == "direct":
+            target, models = primary, (primary,)
+        else:
+            target = LLMGateway(
+                [("primary", lambda: primary), ("fallback", lambda: fallback)],
+                timeout=args.timeout, first_token_timeout=args.timeout, deadline=args.timeout * 2,
+                max_retries=1, backoff_base=0.02, breaker_failures=5, breaker_reset=1.0,
+            )
+            models = (primary, fallback)
+        call = stream_call(target, True) if args.stream else (lambda: target.ainvoke("prompt"))
+        latencies, errors = await drive(call, args.requests, args.concurrency)
+        ordered = sorted(latencies) or [float("nan")]
+        rows.append((mode, percentile(ordered, 50), percentile(ordered, 95), percentile(ordered, 99),
+                     errors / args.requests, sum(m.calls for m in models) / args.requests))
+
+    print(f"\n{name}")
+    print(f"  {'mode':<9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}{'calls/req':>11}")
+    for mode, p50, p95, p99, error_rate, calls in rows:
+        print(f"  {mode:<9}{p50:>9.0f}{p95:>9.0f}{p99:>9.0f}{error_rate:>8.1%}{calls:>11.2f}")
+
+
+async def main(args):
+    kind = "time to first token" if args.stream else "full answer (ainvoke)"
+    print(f"{args.requests} requests x {len(SCENARIOS)} scenarios, concurrency {args.concurrency}, {kind}")
+    for name, (primary_faults, fallback_faults) in SCENARIOS.items():
+        await run_scenario(name, primary_faults, fallback_faults, args)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.1, help="Primary model time to first token (s)")
+    parser.add_argument("--tokens-per-second", type=float, default=2000.0)
+    parser.add_argument("--timeout", type=float, default=5.0, help="Gateway per-attempt timeout (s)")
+    parser.add_argument("--stream", action="store_true", help="Measure streamed time to first token")
+    parser.add_argument("--seed", type=int, default=7)
+    asyncio.run(main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main_cli()
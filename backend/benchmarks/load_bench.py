@@ -0,0 +1,223 @@
+"""
+Offline load test and microbenchmarks.
+
+Boots the FastAPI app in-process (httpx ASGI transport, temporary SQLite
+database and vector store) against a fake chat model and fake translator,
+drives the main endpoints at a fixed concurrency and reports p50/p95/p99
+latency and throughput. Also times retrieval, the formatting pass and
+bcrypt on their own. No network access is needed.
+
+    cd backend && python benchmarks/load_bench.py --requests 200 --concurrency 20 --output run.json
+    python benchmarks/load_bench.py --baseline run.json   # flag regressions against an earlier run
+"""
+from pathlib import Path
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+WORKDIR = Path(tempfile.mkdtemp(prefix="justice-bench-"))
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{WORKDIR / 'bench.db'}")
+os.environ.setdefault("RAG_WARMUP", "0")
+os.environ.setdefault("RAG_PRELOAD", "0")
+os.environ.setdefault("TRANSLATION_BACKEND", "local")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from fakes import FAKE_ANSWER, FakeChatModel, install_fakes
+
+import httpx
+
+import main
+import RAG
+from translation import LocalBackend
+
+QUESTIONS = [
+    "How do I file an FIR at a police station?",
+    "What are my fundamental rights?",
+    "How can I get free legal aid?",
+    "How do I file an RTI application?",
+    "Can I appeal a court decision?",
+    "What should I do if police refuse my complaint?",
+]
+
+
+# ---- Helpers ---- #
+def summarize(latencies, elapsed):
+    ordered = sorted(latencies)
+
+    def pct(p):
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))] * 1000
+
+    return {
+        "requests": len(ordered),
+        "rps": len(ordered) / elapsed if elapsed else 0.0,
+        "p50_ms": pct(50),
+        "p95_ms": pct(95),
+        "p99_ms": pct(99),
+        "mean_ms": statistics.fmean(ordered) * 1000,
+    }
+
+
+async def drive(make_request, total: int, concurrency: int):
+    """Runs `total` calls of make_request(i) with at most `concurrency` in flight."""
+    latencies = []
+    errors = 0
+    next_index = 0
+
+    async def worker():
+        nonlocal next_index, errors
+        while next_index < total:
+            i = next_index
+            next_index += 1
+            start = time.perf_counter()
+            response = await make_request(i)
+            latencies.append(time.perf_counter() - start)
+            if getattr(response, "status_code", 200) >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    result = summarize(latencies, time.perf_counter() - start)
+    result["errors"] = errors
+    return result
+
+
+def time_call(fn, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return summarize(timings, sum(timings))
+
+
+async def time_async_call(fn, repeat: int):
+    timings = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        await fn(i)
+        timings.append(time.perf_counter() - start)
+    return summarize(timings, sum(timings))
+
+
+# ---- Scenarios ---- #
+async def run_endpoints(args):
+    client_transport = httpx.ASGITransport(app=main.app)
+    results = {}
+    async with main.app.router.lifespan_context(main.app):
+        await asyncio.to_thread(RAG.rag_engine.warm_up)
+        async with httpx.AsyncClient(transport=client_transport, base_url="http://bench") as client:
+            credentials = {"username": "bench-user", "password": "bench-password"}
+            await client.post("/register", json=credentials)
+            token = (await client.post("/token", data=credentials)).json()["access_token"]
+            headers = {"Authorization": f"Bearer {token}"}
+
+            def chat(i, language="en"):
+                # Unique wording so the answer cache does not short-circuit the pipeline.
+                question = f"{QUESTIONS[i % len(QUESTIONS)]} (case {i})"
+                return client.post("/chat", json={"user_message": question, "session_id": f"bench-{i % 20}", "language": language}, headers=headers)
+
+            results["chat"] = await drive(chat, args.requests, args.concurrency)
+            results["chat_translated"] = await drive(lambda i: chat(i, "hi"), max(1, args.requests // 4), args.concurrency)
+            # A burst of the same opening question: duplicates share the in-flight answer.
+            same_question = lambda i: client.post("/chat", json={"user_message": "Is my FIR valid if filed late?", "session_id": None}, headers=headers)
+            results["chat_duplicate"] = await drive(same_question, args.concurrency * 2, args.concurrency * 2)
+            results["sessions"] = await drive(lambda i: client.get("/sessions", headers=headers), args.requests, args.concurrency)
+            results["session_history"] = await drive(
+                lambda i: client.get(f"/sessions/bench-{i % 20}/history", headers=headers), args.requests, args.concurrency
+            )
+            results["token"] = await drive(
+                lambda i: client.post("/token", data=credentials), max(1, args.requests // 10), args.concurrency
+            )
+
+            # Persistence alone: concurrent chat rows through the write-behind queue.
+            async with main.AsyncSessionLocal() as db:
+                user_id = (await db.execute(main.select(main.User.id).where(main.User.username == credentials["username"]))).scalar_one()
+            write_row = lambda i: main.save_chat_entry(main.ChatHistory(
+                session_id=f"bench-write-{i % 20}", user_id=user_id, user_message=f"write {i}", bot_response=FAKE_ANSWER, language="en",
+            ), wait=True)
+            results["chat_write"] = await drive(write_row, args.requests * 5, args.concurrency * 4)
+    return results
+
+
+async def run_microbenchmarks(args):
+    results = {}
+    RAG.answer_cache.clear()
+    results["retrieval"] = await time_async_call(lambda i: RAG.aretrieval(f"{QUESTIONS[i % len(QUESTIONS)]} {i}"), args.micro_repeat)
+    long_answer = "\n".join([FAKE_ANSWER] * 20)
+    results["formatting"] = time_call(lambda: RAG.format_response(long_answer), args.micro_repeat)
+    hashed = main.get_password_hash("bench-password")
+    results["bcrypt_hash"] = time_call(lambda: main.get_password_hash("bench-password"), max(1, args.micro_repeat // 20))
+    results["bcrypt_verify"] = time_call(lambda: main.verify_password("bench-password", hashed), max(1, args.micro_repeat // 20))
+    return results
+
+
+# ---- Reporting ---- #
+def print_table(title, results):
+    print(f"\n{title}")
+    print(f"  {'name':<18}{'n':>6}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for name, r in results.items():
+        print(f"  {name:<18}{r['requests']:>6}{r['rps']:>10.1f}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}{r.get('errors', 0):>8}")
+
+
+def compare(current, baseline, tolerance):
+    """Returns the scenarios whose p95 latency got worse than `tolerance` (a fraction) vs the baseline."""
+    regressions = []
+    for section in ("endpoints", "micro"):
+        for name, result in current.get(section, {}).items():
+            before = baseline.get(section, {}).get(name)
+            if before and before["p95_ms"] > 0 and result["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+                regressions.append(f"{section}.{name}: p95 {before['p95_ms']:.2f}ms -> {result['p95_ms']:.2f}ms")
+    return regressions
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100, help="Requests per endpoint scenario")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Fake LLM time to first token, seconds")
+    parser.add_argument("--llm-token-rate", type=float, default=200.0, help="Fake LLM tokens per second")
+    parser.add_argument("--translate-latency", type=float, default=0.05, help="Fake translation round trip per chunk, seconds")
+    parser.add_argument("--micro-repeat", type=int, default=200)
+    parser.add_argument("--with-cache", action="store_true", help="Leave the semantic answer cache enabled")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--baseline", help="Earlier JSON results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed p95 slowdown vs baseline (fraction)")
+    args = parser.parse_args()
+
+    install_fakes(RAG.rag_engine, WORKDIR / "chroma", llm=FakeChatModel(args.llm_latency, args.llm_token_rate))
+    main.translator.backend = LocalBackend(args.translate_latency)
+    if not args.with_cache:
+        RAG.answer_cache.threshold = 2.0  # cosine similarity never exceeds 1
+
+    results = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "args": vars(args),
+        },
+        "endpoints": asyncio.run(run_endpoints(args)),
+    }
+    results["micro"] = asyncio.run(run_microbenchmarks(args))
+
+    print_table("Endpoints", results["endpoints"])
+    print(f"\n  answer flights: {RAG.answer_flights.stats()}")
+    print_table("Microbenchmarks", results["micro"])
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+    if args.baseline:
+        regressions = compare(results, json.loads(Path(args.baseline).read_text()), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,70 @@
+"""
+Startup-time benchmark.
+
+Measures, in fresh interpreters, how long a worker takes before it can
+accept requests now that RAG loading is lazy ("lazy": `import main`)
+against the old behaviour where the model and vector store were built at
+import time ("eager": `import main` followed by a full warm-up).
+
+    cd backend && python benchmarks/startup_bench.py --runs 5
+"""
+from pathlib import Path
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+SCENARIOS = {
+    "lazy": "import main",
+    "eager": "import main; main.rag_engine.warm_up(); assert main.rag_engine.ready, main.rag_engine.warmup_error",
+}
+
+TIMER = """
+import os, time
+os.environ["RAG_PRELOAD"] = "0"
+start = time.perf_counter()
+{body}
+print(time.perf_counter() - start)
+"""
+
+
+def run_once(body: str) -> float:
+    result = subprocess.run(
+        [sys.executable, "-c", TIMER.format(body=body)],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = {}
+    for name, body in SCENARIOS.items():
+        timings = [run_once(body) for _ in range(args.runs)]
+        results[name] = {
+            "runs": args.runs,
+            "median_s": statistics.median(timings),
+            "min_s": min(timings),
+            "max_s": max(timings),
+        }
+        print(f"{name:>6}: median {results[name]['median_s']:.3f}s (min {results[name]['min_s']:.3f}s)")
+
+    speedup = results["eager"]["median_s"] / results["lazy"]["median_s"]
+    print(f"time to accept requests is {speedup:.1f}x shorter with lazy loading")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Vector store benchmark: Chroma vs the quantized memory-mapped store.
+
+Builds each store from the same synthetic clustered 384-dim corpus, then
+opens it in a fresh subprocess and reports recall@k against exact float32
+cosine search, per-query latency and the memory the process gained by
+opening the store and querying it (RSS). No embedding model is needed.
+
+    cd backend && python benchmarks/vector_bench.py --n 20000 --queries 200
+"""
+from pathlib import Path
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from quantstore import QuantizedVectorStore
+
+DIM = 384
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def make_corpus(n: int, queries: int, clusters: int = 200, seed: int = 0):
+    """Gaussian clusters, like topic-grouped chunks; queries are perturbed corpus vectors."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, DIM)).astype(np.float32)
+    vectors = centers[rng.integers(0, clusters, n)] + 0.8 * rng.standard_normal((n, DIM)).astype(np.float32)
+    picks = rng.integers(0, n, queries)
+    query_vectors = vectors[picks] + 0.5 * rng.standard_normal((queries, DIM)).astype(np.float32)
+    return vectors, query_vectors
+
+
+def exact_top_k(vectors, queries, k: int):
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    scores = (queries / np.linalg.norm(queries, axis=1, keepdims=True)) @ unit.T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+# ---- Build ---- #
+def build_chroma(directory: Path, vectors):
+    import chromadb
+    client = chromadb.PersistentClient(path=str(directory))
+    collection = client.get_or_create_collection("bench", metadata={"hnsw:space": "cosine"})
+    step = 4000
+    for start in range(0, len(vectors), step):
+        chunk = vectors[start:start + step]
+        ids = [str(i) for i in range(start, start + len(chunk))]
+        collection.add(ids=ids, embeddings=chunk.tolist(), documents=ids)
+
+
+def build_quantized(directory: Path, vectors, options):
+    store = QuantizedVectorStore(directory, **options)
+    ids = [str(i) for i in range(len(vectors))]
+    store.upsert(ids=ids, embeddings=vectors, documents=ids)
+
+
+# ---- Measure (runs in a fresh process) ---- #
+def measure(backend: str, directory: Path, workdir: Path, k: int, options) -> dict:
+    queries = np.load(workdir / "queries.npy")
+    truth = np.load(workdir / "truth.npy")
+    before = rss_mb()
+
+    if backend == "chroma":
+        import chromadb
+        collection = chromadb.PersistentClient(path=str(directory)).get_collection("bench")
+
+        def search(query):
+            return [int(i) for i in collection.query(query_embeddings=[query.tolist()], n_results=k, include=[])["ids"][0]]
+    else:
+        store = QuantizedVectorStore(directory, **options)
+
+        def search(query):
+            return [int(store.ids[i]) for i, _ in store.search(query[None, :], k)[0]]
+
+    opened = rss_mb()
+    latencies, hits = [], 0
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        found = search(query)
+        latencies.append(time.perf_counter() - start)
+        hits += len(set(found) & set(expected.tolist()))
+    result = {
+        "recall_at_k": hits / truth.size,
+        "p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "p95_ms": float(np.percentile(latencies, 95) * 1000),
+        "rss_open_mb": opened - before,
+        "rss_total_mb": rss_mb() - before,
+    }
+    if backend != "chroma":
+        start = time.perf_counter()
+        store.search(queries, k)
+        result["batch_ms_per_query"] = (time.perf_counter() - start) * 1000 / len(queries)
+    return result
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=20000, help="Corpus size")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--ivf-lists", type=int, default=0, help="IVF clusters for the IVF run (default: sqrt(n))")
+    parser.add_argument("--measure", help=argparse.SUPPRESS)
+    parser.add_argument("--directory", help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    parser.add_argument("--options", default="{}", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.measure, Path(args.directory), Path(args.workdir), args.k, json.loads(args.options))))
+        return
+
+    workdir = Path(tempfile.mkdtemp(prefix="justice-vector-bench-"))
+    vectors, queries = make_corpus(args.n, args.queries)
+    np.save(workdir / "queries.npy", queries)
+    np.save(workdir / "truth.npy", exact_top_k(vectors, queries, args.k))
+
+    ivf_lists = args.ivf_lists or int(np.sqrt(args.n))
+    configs = [
+        ("chroma (hnsw, float32)", "chroma", {}),
+        ("int8 + rescore", "quantized", {"dtype": "int8", "rescore": True}),
+        ("int8", "quantized", {"dtype": "int8", "rescore": False}),
+        ("float16", "quantized", {"dtype": "float16", "rescore": False}),
+        (f"int8 + rescore, ivf {ivf_lists}/8", "quantized", {"dtype": "int8", "rescore": True, "n_lists": ivf_lists, "nprobe": 8}),
+    ]
+    print(f"corpus {args.n} x {DIM}, {args.queries} queries, k={args.k}")
+    print(f"  {'store':<30}{'build s':>9}{'recall':>8}{'p50 ms':>9}{'p95 ms':>9}{'batch ms/q':>12}{'RSS MB':>9}{'disk MB':>9}")
+    for i, (name, backend, options) in enumerate(configs):
+        directory = workdir / f"store-{i}"
+        start = time.perf_counter()
+        if backend == "chroma":
+            build_chroma(directory, vectors)
+        else:
+            build_quantized(directory, vectors, options)
+        build_seconds = time.perf_counter() - start
+        disk = sum(f.stat().st_size for f in directory.rglob("*") if f.is_file()) / 2**20
+
+        output = subprocess.run(
+            [sys.executable, __file__, "--measure", backend, "--directory", str(directory), "--workdir", str(workdir),
+             "--k", str(args.k), "--options", json.dumps(options)],
+            capture_output=True, text=True, check=True, env={**os.environ, "ANONYMIZED_TELEMETRY": "False"},
+        ).stdout
+        r = json.loads(output.strip().splitlines()[-1])
+        batch = f"{r['batch_ms_per_query']:.3f}" if "batch_ms_per_query" in r else "-"
+        print(f"  {name:<30}{build_seconds:>9.1f}{r['recall_at_k']:>8.3f}{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}{batch:>12}{r['rss_total_mb']:>9.1f}{disk:>9.1f}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,98 @@
+"""
+Offline build of the FAQ answer store (see faq.py).
+
+Embeds every example question in faq.FAQ_INTENTS with the production
+embedding model, generates each intent's answer once through the RAG
+pipeline (retrieval, prompt, LLM, formatting), translates it into the
+chat languages and writes the store next to the vector store, replacing
+the previous one. The build fails rather than storing an error or
+fallback answer; a language whose translation fails is left out and
+translated live when asked for.
+
+    cd backend && python build_faq.py
+    python build_faq.py --languages hi,ta --translation-backend google
+
+Re-run after ingesting documents or editing the intents. Running API
+workers keep the store they loaded; restart them after a run.
+"""
+from pathlib import Path
+import argparse
+import asyncio
+import json
+import logging
+import os
+
+from faq import FAQ_INTENTS, FAQStore
+from RAG import ARAG, EMBEDDING_MODEL, EXTRACTIVE_NOTE, LLM_ERROR_MESSAGE, PERSIST_DIR, rag_engine
+from translation import BACKENDS, TranslationService
+
+# Languages offered by the chat UI besides English.
+LANGUAGES = ["hi", "bn", "te", "mr", "ta", "ur", "gu", "kn", "or", "pa", "ml", "as"]
+
+
+async def generate_answer(intent) -> str:
+    question = intent["questions"][0]
+    answer = await ARAG(question)
+    if LLM_ERROR_MESSAGE in answer or EXTRACTIVE_NOTE in answer:
+        raise RuntimeError(f"no answer generated for intent {intent['id']!r} ({question!r})")
+    return answer
+
+
+async def translate_answers(translator, answer: str, languages):
+    """{language: translation} for every language that translated successfully."""
+    results = await asyncio.gather(*(translator.translate(answer, language) for language in languages), return_exceptions=True)
+    translations = {}
+    for language, result in zip(languages, results):
+        if isinstance(result, Exception):
+            logging.error(f"Translation error ({language}): {result}")
+        else:
+            translations[language] = result
+    return translations
+
+
+async def build_store(translator, languages=LANGUAGES, intents=FAQ_INTENTS) -> FAQStore:
+    await rag_engine.ensure_ready()
+    answers = await asyncio.gather(*(generate_answer(intent) for intent in intents))
+
+    entries = []
+    for intent, answer in zip(intents, answers):
+        translations = await translate_answers(translator, answer, languages)
+        entries.append({"id": intent["id"], "answers": {"en": answer, **translations}})
+
+    questions, rows = [], []
+    for index, intent in enumerate(intents):
+        questions.extend(intent["questions"])
+        rows.extend([index] * len(intent["questions"]))
+    vectors = await asyncio.to_thread(rag_engine.embeddings.embed_array, questions)
+    return FAQStore(entries, questions, rows, vectors, EMBEDDING_MODEL)
+
+
+async def run(args) -> dict:
+    rag_engine.persist_dir = args.persist_dir
+    languages = [language for language in args.languages.split(",") if language and language != "en"]
+    translator = TranslationService(BACKENDS[args.translation_backend]())
+    try:
+        store = await build_store(translator, languages)
+    finally:
+        await translator.aclose()
+    store.save(rag_engine.faq_dir)
+    return {
+        "directory": str(Path(rag_engine.faq_dir).resolve()),
+        **store.stats(),
+        "languages": {entry["id"]: sorted(entry["answers"]) for entry in store.intents},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--persist-dir", default=PERSIST_DIR)
+    parser.add_argument("--languages", default=",".join(LANGUAGES), help="Comma-separated language codes to pre-translate")
+    parser.add_argument("--translation-backend", default=os.getenv("TRANSLATION_BACKEND", "google"), choices=sorted(BACKENDS))
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    print(json.dumps(asyncio.run(run(args)), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+from collections import OrderedDict
+import threading
+import time
+
+import numpy as np
+
+
+class LRUCache:
+    """
+    Size-bounded LRU mapping with an optional time-to-live per entry.
+    Safe to share between the event loop and executor threads.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _expired(self, stored_at: float) -> bool:
+        return self.ttl is not None and time.monotonic() - stored_at > self.ttl
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or self._expired(item[1]):
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            item = self._data.pop(key, None)
+            return default if item is None else item[0]
+
+    def items(self):
+        """Live (key, value) pairs, oldest first. Expired entries are dropped."""
+        with self._lock:
+            for key in [k for k, (_, stored_at) in self._data.items() if self._expired(stored_at)]:
+                del self._data[key]
+            return [(key, value) for key, (value, _) in self._data.items()]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key) -> bool:
+        """Membership without counting a hit or miss; expired entries still count until read."""
+        with self._lock:
+            return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SemanticCache:
+    """
+    Answer cache keyed by question meaning rather than exact wording.
+
+    Questions are first matched exactly after whitespace/case normalisation.
+    Otherwise the query embedding is compared against every cached question
+    in one matrix product, and the best match is reused when its cosine
+    similarity reaches `threshold`.
+    """
+
+    def __init__(self, threshold: float = 0.9, maxsize: int = 512, ttl: float = 3600):
+        self.threshold = threshold
+        self._entries = LRUCache(maxsize=maxsize, ttl=ttl)
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize(question: str) -> str:
+        return " ".join(question.lower().split())
+
+    @staticmethod
+    def _unit(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def get_exact(self, question: str):
+        entry = self._entries.get(self.normalize(question))
+        if entry is None:
+            return None
+        self.exact_hits += 1
+        return entry[1]
+
+    def get_similar(self, question_vector):
+        entries = [entry for entry in self._entries.items() if entry[1][0] is not None]
+        if not entries:
+            self.misses += 1
+            return None
+        matrix = np.stack([vector for _, (vector, _) in entries])
+        scores = matrix @ self._unit(question_vector)
+        best = int(np.argmax(scores))
+        if scores[best] < self.threshold:
+            self.misses += 1
+            return None
+        key, (_, answer) = entries[best]
+        self._entries.get(key)  # refresh LRU position
+        self.semantic_hits += 1
+        return answer
+
+    def put(self, question: str, question_vector, answer: str):
+        """Caches an answer; without a vector it is only found by exact match."""
+        vector = None if question_vector is None else self._unit(question_vector)
+        self._entries.set(self.normalize(question), (vector, answer))
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,125 @@
+"""
+Context assembly between retrieval and prompt building.
+
+Retrieved snippets often overlap (neighbouring chunks, the same provision
+quoted twice). Before they go into the prompt, near-duplicates are
+dropped and the rest are picked with maximal marginal relevance (MMR), so
+each snippet adds something new. Long snippets are trimmed to the
+sentences that share the most terms with the question, and the whole
+context is held to a token budget.
+"""
+import re
+
+import numpy as np
+
+from hybrid import tokenize
+from memory import estimate_tokens, truncate_tokens
+from metrics import registry
+
+CONTEXT_TOKENS_SAVED = registry.histogram(
+    "rag_context_tokens_saved",
+    "Estimated prompt tokens removed from the retrieved context per request.",
+    buckets=(0, 25, 50, 100, 200, 400, 800, 1600, 3200),
+)
+CONTEXT_TOKENS = registry.histogram(
+    "rag_context_tokens",
+    "Estimated tokens of retrieved context sent to the LLM per request.",
+    buckets=(0, 50, 100, 200, 400, 600, 800, 1200, 1600, 3200),
+)
+
+_SENTENCE_END = re.compile(r"(?<=[.!?;])\s+(?=[A-Z0-9(\"'])")
+
+
+def split_sentences(text: str):
+    return [sentence for sentence in _SENTENCE_END.split(text.strip()) if sentence]
+
+
+def _unit_rows(matrix) -> np.ndarray:
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class ContextCompressor:
+    """
+    `k` snippets at most, chosen by MMR with weight `diversity` on novelty;
+    a candidate whose cosine similarity to an already chosen snippet reaches
+    `duplicate_threshold` is dropped. Snippets longer than
+    `max_sentences` keep only their most query-relevant sentences, and the
+    context never exceeds `max_tokens`.
+    """
+
+    def __init__(self, k: int = 5, max_tokens: int = 600, duplicate_threshold: float = 0.92,
+                 diversity: float = 0.3, max_sentences: int = 3):
+        self.k = k
+        self.max_tokens = max_tokens
+        self.duplicate_threshold = duplicate_threshold
+        self.diversity = diversity
+        self.max_sentences = max_sentences
+
+    def select(self, query_vector, vectors):
+        """Indices of the chosen candidates, most relevant first."""
+        vectors = _unit_rows(vectors)
+        query = np.asarray(query_vector, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        relevance = vectors @ query
+        similarity = vectors @ vectors.T
+
+        chosen = []
+        remaining = list(range(len(vectors)))
+        while remaining and len(chosen) < self.k:
+            if chosen:
+                redundancy = similarity[np.ix_(remaining, chosen)].max(axis=1)
+            else:
+                redundancy = np.zeros(len(remaining), dtype=np.float32)
+            scores = (1 - self.diversity) * relevance[remaining] - self.diversity * redundancy
+            best = int(np.argmax(scores))
+            candidate = remaining.pop(best)
+            if redundancy[best] >= self.duplicate_threshold:
+                continue
+            chosen.append(candidate)
+        return chosen
+
+    def trim(self, snippet: str, query_terms) -> str:
+        """Keeps the max_sentences sentences sharing most terms with the query, in their original order."""
+        sentences = split_sentences(snippet)
+        if len(sentences) <= self.max_sentences or not query_terms:
+            return snippet
+        overlap = [len(query_terms.intersection(tokenize(sentence))) for sentence in sentences]
+        ranked = sorted(range(len(sentences)), key=lambda i: (-overlap[i], i))[:self.max_sentences]
+        return " ".join(sentences[i] for i in sorted(ranked))
+
+    def compress(self, query: str, snippets, query_vector=None, vectors=None):
+        """
+        Returns the snippets to put in the prompt. Without vectors (keyword
+        queries are never embedded) only exact duplicates are removed.
+        """
+        baseline = sum(estimate_tokens(snippet) for snippet in snippets[:self.k])
+        if query_vector is not None and vectors is not None and len(snippets) > 0:
+            order = self.select(query_vector, vectors)
+        else:
+            seen, order = set(), []
+            for i, snippet in enumerate(snippets):
+                if snippet not in seen:
+                    seen.add(snippet)
+                    order.append(i)
+            order = order[:self.k]
+
+        query_terms = set(tokenize(query))
+        context, used = [], 0
+        for i in order:
+            snippet = self.trim(snippets[i], query_terms)
+            cost = estimate_tokens(snippet)
+            if used + cost > self.max_tokens:
+                if not context:
+                    context.append(truncate_tokens(snippet, self.max_tokens))
+                    used = estimate_tokens(context[0])
+                    break
+                continue  # a shorter, less relevant snippet may still fit
+            context.append(snippet)
+            used += cost
+
+        CONTEXT_TOKENS.observe(used)
+        CONTEXT_TOKENS_SAVED.observe(max(0, baseline - used))
+        return context
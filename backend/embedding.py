@@ -0,0 +1,172 @@
+from langchain_core.embeddings import Embeddings
+from cache import LRUCache
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+
+import numpy as np
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Content-addressed cache around another Embeddings object.
+
+    Vectors are keyed by a SHA-256 of (model, text) and kept as float32 in a
+    memory-bounded LRU. When `persist_path` is given they are also written to
+    a small SQLite file so a restarted worker does not re-embed known texts.
+    Only the texts missing from both layers are sent to the wrapped model,
+    in a single embed_documents call.
+    """
+
+    def __init__(self, base: Embeddings, model_name: str, max_memory_mb: float = 64, persist_path: str = None):
+        self.base = base
+        self.model_name = model_name
+        self.max_bytes = int(max_memory_mb * 1024 * 1024)
+        # Resized once the vector width is known.
+        self._memory = LRUCache(maxsize=1024)
+        self.persist_path = persist_path
+        self._db = None
+        self._db_pid = None
+        self._db_lock = threading.Lock()
+
+    def _connection(self):
+        """
+        The SQLite cache, opened on first use in each process: the object may
+        be created before a pre-forking server forks, and a connection must
+        not be shared across the fork. Call with _db_lock held.
+        """
+        if self._db_pid != os.getpid():
+            self._db = sqlite3.connect(self.persist_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS embedding (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+            self._db.commit()
+            self._db_pid = os.getpid()
+        return self._db
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def _load(self, keys):
+        if not self.persist_path or not keys:
+            return {}
+        found = {}
+        with self._db_lock:
+            db = self._connection()
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = db.execute(f"SELECT key, vector FROM embedding WHERE key IN ({placeholders})", chunk)
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def _store(self, items):
+        for key, vector in items:
+            self._memory.set(key, vector)
+        if self.persist_path and items:
+            with self._db_lock:
+                db = self._connection()
+                db.executemany(
+                    "INSERT OR REPLACE INTO embedding (key, vector) VALUES (?, ?)",
+                    [(key, vector.tobytes()) for key, vector in items],
+                )
+                db.commit()
+
+    def embed_array(self, texts) -> np.ndarray:
+        """Embeds `texts` into an (n, dim) float32 matrix, using the cache where possible."""
+        keys = [self._key(text) for text in texts]
+        vectors = [self._memory.get(key) for key in keys]
+
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        from_disk = self._load([keys[i] for i in missing])
+        for i in missing:
+            if keys[i] in from_disk:
+                vectors[i] = from_disk[keys[i]]
+                self._memory.set(keys[i], vectors[i])
+
+        todo = {}
+        for i, vector in enumerate(vectors):
+            if vector is None:
+                todo.setdefault(texts[i], []).append(i)
+        if todo:
+            computed = np.asarray(self.base.embed_documents(list(todo)), dtype=np.float32)
+            self._memory.maxsize = max(1, self.max_bytes // computed[0].nbytes)
+            new_items = []
+            for vector, indices in zip(computed, todo.values()):
+                for i in indices:
+                    vectors[i] = vector
+                new_items.append((keys[indices[0]], vector))
+            self._store(new_items)
+
+        if not vectors:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.stack(vectors)
+
+    def cached(self, text: str):
+        """The in-memory vector for `text`, or None; never runs the model."""
+        key = self._key(text)
+        return self._memory.get(key) if key in self._memory else None
+
+    def embed_documents(self, texts):
+        return self.embed_array(texts).tolist()
+
+    def embed_query(self, text):
+        return self.embed_array([text])[0].tolist()
+
+    def stats(self) -> dict:
+        return {"size": len(self._memory), "hits": self._memory.hits, "misses": self._memory.misses}
+
+
+class EmbeddingBatcher:
+    """
+    Coalesces concurrent query embeddings into one batched call.
+
+    The first query to arrive opens a batch; queries arriving within
+    `max_wait_ms` (or until `max_batch` is reached) join it, and the whole
+    batch is embedded with a single embed_array() call on `executor`.
+    """
+
+    def __init__(self, embeddings: CachedEmbeddings, executor=None, max_batch: int = 32, max_wait_ms: float = 5):
+        self.embeddings = embeddings
+        self.executor = executor
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._pending = []
+        self._timer = None
+
+    async def embed(self, text: str) -> np.ndarray:
+        # A query embedded moments ago (e.g. by FAQ routing) does not wait for a batch.
+        vector = self.embeddings.cached(text)
+        if vector is not None:
+            return vector
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            asyncio.ensure_future(self._run(batch))
+
+    async def _run(self, batch):
+        loop = asyncio.get_running_loop()
+        try:
+            matrix = await loop.run_in_executor(self.executor, self.embeddings.embed_array, [text for text, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for row, (_, future) in zip(matrix, batch):
+            if not future.done():
+                future.set_result(row)
@@ -0,0 +1,168 @@
+"""
+Precomputed answers for the stock questions that make up most chat traffic.
+
+FAQ_INTENTS lists each intent with example phrasings; the first one is the
+question its answer is generated for. build_faq.py embeds every example,
+generates the answer once through the RAG pipeline, translates it into the
+chat languages and saves an FAQStore. At request time a question is routed
+to an intent by an exact (normalised) match on the examples, or by one
+matrix-vector product of its embedding against all example rows; a close
+enough match is answered from the store without retrieval, the LLM or
+translation.
+"""
+from datetime import datetime, timezone
+from pathlib import Path
+import json
+import os
+
+import numpy as np
+
+FAQ_INTENTS = [
+    {
+        "id": "greeting",
+        "questions": ["hello", "hi", "hey", "hi there", "hello there", "namaste", "good morning", "good afternoon", "good evening"],
+    },
+    {
+        "id": "file_fir",
+        "questions": [
+            "How do I file an FIR?",
+            "How do I file an FIR at a police station?",
+            "What is the procedure to lodge an FIR?",
+            "How can I register a police complaint?",
+            "How do I report a crime to the police?",
+        ],
+    },
+    {
+        "id": "fir_refused",
+        "questions": [
+            "What should I do if the police refuse to register my FIR?",
+            "What should I do if police refuse my complaint?",
+            "The police are not registering my complaint, what can I do?",
+            "Where can I go if the police station will not file my FIR?",
+        ],
+    },
+    {
+        "id": "rti",
+        "questions": [
+            "How do I file an RTI application?",
+            "How do I apply for information under the Right to Information Act?",
+            "What is the procedure for an RTI request?",
+            "How can I get information from a government department?",
+        ],
+    },
+    {
+        "id": "legal_aid",
+        "questions": [
+            "How can I get free legal aid?",
+            "Who is eligible for free legal aid?",
+            "I cannot afford a lawyer, what can I do?",
+            "How do I get a lawyer appointed by the court?",
+        ],
+    },
+    {
+        "id": "appeal",
+        "questions": [
+            "How do I appeal a court decision?",
+            "Can I appeal a court decision?",
+            "How can I challenge a court judgment?",
+            "What is the procedure to file an appeal against an order?",
+        ],
+    },
+    {
+        "id": "human_rights_complaint",
+        "questions": [
+            "How do I file a complaint with the Human Rights Commission?",
+            "Where can I complain about a human rights violation?",
+            "How do I report a human rights violation by a government authority?",
+        ],
+    },
+    {
+        "id": "arrest_rights",
+        "questions": [
+            "What are my rights if I am arrested?",
+            "What rights do I have during police questioning?",
+            "What are my rights in police custody?",
+        ],
+    },
+]
+
+
+def normalize_question(question: str) -> str:
+    """Lower-cased, single-spaced, without surrounding punctuation ("Hello!" -> "hello")."""
+    return " ".join(question.lower().split()).strip(" ?!.,")
+
+
+GREETINGS = frozenset(
+    normalize_question(q) for intent in FAQ_INTENTS if intent["id"] == "greeting" for q in intent["questions"]
+)
+
+
+class FAQStore:
+    """
+    Example questions with their unit-normalised embeddings (one row each,
+    `rows[i]` is the intent of row i) and every intent's answer per
+    language. Saved as vectors.npy and meta.json in one directory.
+    """
+
+    def __init__(self, intents, questions, rows, vectors, model_name: str, built_at: str = None):
+        self.intents = intents  # [{"id": ..., "answers": {language: text}}]
+        self.questions = list(questions)
+        self.rows = np.asarray(rows, dtype=np.int32)
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        self.vectors = vectors / np.where(norms == 0, 1, norms)
+        self.model_name = model_name
+        self.built_at = built_at or datetime.now(timezone.utc).isoformat(timespec="seconds")
+        self._exact = {normalize_question(q): int(row) for q, row in zip(self.questions, self.rows)}
+
+    def lookup(self, question: str):
+        """Answers of the intent one of whose examples is `question` (after normalisation), or None."""
+        row = self._exact.get(normalize_question(question))
+        return None if row is None else self.intents[row]["answers"]
+
+    def match(self, query_vector, threshold: float):
+        """Answers of the intent with the example closest to `query_vector`, or None below `threshold`."""
+        query = np.asarray(query_vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if not norm or not len(self.questions):
+            return None
+        scores = self.vectors @ (query / norm)
+        best = int(np.argmax(scores))
+        if scores[best] < threshold:
+            return None
+        return self.intents[self.rows[best]]["answers"]
+
+    # ---- Storage ---- #
+    @staticmethod
+    def exists(directory) -> bool:
+        return (Path(directory) / "meta.json").exists()
+
+    def save(self, directory):
+        """Writes both files through temporary names, so a running reader never sees a half-written store."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        tmp = directory / "vectors.tmp.npy"
+        np.save(tmp, self.vectors)
+        os.replace(tmp, directory / "vectors.npy")
+        meta = {
+            "model": self.model_name,
+            "built_at": self.built_at,
+            "questions": self.questions,
+            "rows": self.rows.tolist(),
+            "intents": self.intents,
+        }
+        tmp = directory / "meta.tmp.json"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp, directory / "meta.json")
+
+    @classmethod
+    def load(cls, directory):
+        directory = Path(directory)
+        with open(directory / "meta.json", encoding="utf-8") as f:
+            meta = json.load(f)
+        vectors = np.load(directory / "vectors.npy")
+        return cls(meta["intents"], meta["questions"], meta["rows"], vectors, meta["model"], meta["built_at"])
+
+    def stats(self) -> dict:
+        return {"intents": len(self.intents), "questions": len(self.questions)}
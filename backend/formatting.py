@@ -0,0 +1,171 @@
+"""
+Chat formatting of LLM answers.
+
+The answer goes through four compiled substitutions with template
+replacements and then a line tidy-up, so the work per answer stays in the
+regex engine. This is not the single-pass tokenizer first planned for it:
+that tokenizer ran Python code for every sentence end, bullet and number,
+and was slower than the chained re.sub calls it replaced. These passes are
+about 20% faster than those calls (benchmarks/format_bench.py: 0.28ms vs
+0.34ms on a 7KB answer). Every pattern starts with the character it is
+about (a "*", a digit, a bullet or a "."), and the context checks are
+lookbehinds placed after it. The rules:
+
+- **text** becomes <strong>text</strong> (a span does not cross lines);
+- a list number ("1." to "99." in ASCII digits, followed by whitespace)
+  starts a new line and keeps its text on that line. Decimals ("154.2"), longer numbers ("2005.")
+  and references ("Section 21.", "No. 4.") are left alone;
+- a bullet (•) starts a new line;
+- ". " ends the line, except after common abbreviations ("Rs.", "e.g."),
+  after a list number and after a Roman numeral heading at the start of a
+  line ("II. Steps");
+- blank lines collapse, trailing spaces are dropped, and the answer is
+  stripped.
+
+ResponseFormatter applies the same substitutions to a stream of chunks and
+gives the same text as format_response() on the whole answer.
+"""
+import re
+
+# Words after which "N." is a reference, not a list item.
+REFERENCE_WORDS = frozenset({
+    "section", "sec", "s", "article", "art", "rule", "clause", "cl", "order", "chapter",
+    "schedule", "para", "paragraph", "part", "regulation", "form", "no", "nos", "item",
+})
+# Abbreviations whose ". " does not end a sentence.
+ABBREVIATIONS = frozenset({
+    "rs", "no", "nos", "sec", "art", "cl", "vs", "v", "mr", "mrs", "ms", "dr", "hon", "i.e", "e.g", "u.s",
+})
+# Roman numerals accepted as headings (I to XLIX).
+ROMAN_NUMERALS = [
+    tens + units
+    for tens in ("", "X", "XX", "XXX", "XL")
+    for units in ("", "I", "II", "III", "IV", "V", "VI", "VII", "VIII", "IX")
+][1:]
+
+
+def _not_after(words, before: str, after: str) -> str:
+    """Lookbehinds rejecting `before` + word + `after` (one per word length, as lookbehinds need a fixed width)."""
+    by_length = {}
+    for word in sorted(words):
+        by_length.setdefault(len(word), []).append(re.escape(word))
+    return "".join(f"(?<!{before}(?:{'|'.join(group)}){after})" for group in by_length.values())
+
+
+_BOLD = re.compile(r"\*\*([^\n]*?)\*\*")
+# The lookbehinds sit after the first digit: not part of a longer number or
+# a decimal, and not after a reference word ("Section 4.", "No. 4.").
+_MARKER = re.compile(
+    r"([0-9](?<![\w.]\d)(?:(?<![a-zA-Z.]\s\d)|"
+    + _not_after(REFERENCE_WORDS, r"\b(?i:", r")\s\d")
+    + _not_after(REFERENCE_WORDS, r"\b(?i:", r")\.\s\d")
+    + r")\d?)\.(?:\s+|\Z)"
+)
+_BULLET = re.compile(r"•\s*")
+# A "." after a letter or digit ends the sentence unless it closes a list
+# number at the start of a line, an abbreviation or a Roman numeral heading
+# (only looked up after I, V, X or L).
+_STOP = re.compile(
+    r"\.(?=\s)(?:(?<![\da-zA-Z]\.)|(?<!^\d\.)(?<!^\d\d\.)"
+    + _not_after(ABBREVIATIONS, r"(?<![\w.])(?i:", r")\.")
+    + r"(?:(?<![IVXL]\.)|"
+    + _not_after(ROMAN_NUMERALS, "^", r"\.")
+    + _not_after(ROMAN_NUMERALS, r"\.\s", r"\.")
+    + r"))\s+",
+    re.M,
+)
+PASSES = [
+    (_BOLD, r"<strong>\1</strong>"),
+    (_MARKER, r"\n\1. "),
+    (_BULLET, "\n• "),
+    (_STOP, ".\n"),
+]
+# Longest context the lookbehinds above read before a match.
+_LOOKBACK = 32
+
+
+def _tidy_lines(text: str) -> str:
+    """Drops trailing spaces and blank lines; the first line continues text that came before."""
+    lines = text.split("\n")
+    if len(lines) == 1:
+        return text
+    return "\n".join([lines[0].rstrip()] + [line.rstrip() for line in lines[1:] if line and not line.isspace()])
+
+
+def _sub_from(pattern, replacement: str, text: str, start: int) -> str:
+    """pattern.sub() on text[start:], with text[:start] visible to lookbehinds."""
+    out, last = [], start
+    for match in pattern.finditer(text, start):
+        out.append(text[last:match.start()])
+        out.append(match.expand(replacement))
+        last = match.end()
+    out.append(text[last:])
+    return "".join(out)
+
+
+class ResponseFormatter:
+    """
+    Formats an answer fed in chunks: feed() returns the formatted text that
+    is final so far and flush() the rest.
+
+    Input is formatted up to the start of its last whitespace run, as long as
+    no bold span is open on that line and the run does not follow a "." or a
+    bullet, so no match spans two pieces. Each pass keeps the tail of what it
+    has read as context for its lookbehinds on the next piece.
+    """
+
+    def __init__(self):
+        self._pending = ""
+        self._tails = [""] * len(PASSES)
+        self._started = False
+
+    def _format(self, piece: str) -> str:
+        for i, (pattern, replacement) in enumerate(PASSES):
+            tail = self._tails[i]
+            text = tail + piece
+            self._tails[i] = text[-_LOOKBACK:]
+            piece = _sub_from(pattern, replacement, text, len(tail))
+        return _tidy_lines(piece)
+
+    def _emit(self, text: str) -> str:
+        if not self._started:
+            text = text.lstrip()
+            self._started = bool(text)
+        return text
+
+    def _safe_cut(self) -> int:
+        pending = self._pending
+        end = len(pending)
+        while end > 0:
+            space = end - 1
+            while space >= 0 and not pending[space].isspace():
+                space -= 1
+            if space < 0:
+                return 0
+            start = space
+            while start > 0 and pending[start - 1].isspace():
+                start -= 1
+            line_start = pending.rfind("\n", 0, start) + 1
+            if start > 0 and pending[start - 1] not in ".•" and pending.count("**", line_start, start) % 2 == 0:
+                return start
+            end = start
+        return 0
+
+    def feed(self, chunk: str) -> str:
+        self._pending += chunk
+        cut = self._safe_cut()
+        if cut == 0:
+            return ""
+        piece, self._pending = self._pending[:cut], self._pending[cut:]
+        return self._emit(self._format(piece))
+
+    def flush(self) -> str:
+        piece, self._pending = self._pending, ""
+        return self._emit(self._format(piece).rstrip())
+
+
+def format_response(content: str) -> str:
+    """Applies the chat formatting rules to a whole LLM answer, one substitution pass per rule."""
+    for pattern, replacement in PASSES:
+        content = pattern.sub(replacement, content)
+    return _tidy_lines(content).strip()
@@ -0,0 +1,14 @@
+# Pre-forking deployment: the app (and the embedding model weights via
+# RAG_PRELOAD) is loaded once in the master, so forked workers share the
+# model pages copy-on-write instead of each loading their own copy. LLM
+# clients and the embedding cache database are opened in each worker.
+#
+#   gunicorn main:app -c gunicorn.conf.py
+import os
+
+os.environ.setdefault("RAG_PRELOAD", "1")
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
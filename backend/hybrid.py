@@ -0,0 +1,205 @@
+"""
+In-process BM25 index and reciprocal-rank fusion with vector search.
+
+The inverted index is stored as flat NumPy arrays (CSR-style postings:
+per-term offsets into one doc-index array and one term-frequency array),
+written at ingest time and memory-mapped on startup. Only the
+vocabulary and document ids are kept in memory; hits are returned as ids
+and their texts are read from the vector store.
+"""
+from pathlib import Path
+import json
+import math
+import re
+
+import numpy as np
+
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:\.[0-9]+)*")
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for", "from", "how",
+    "i", "if", "in", "is", "it", "me", "my", "of", "on", "or", "the", "to", "what", "when",
+    "where", "which", "who", "why", "with", "you", "your",
+}
+
+
+def tokenize(text: str):
+    """Lower-cased word tokens; keeps dotted section numbers such as 154.2 intact."""
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+class LexicalIndex:
+    """
+    BM25 over an array-backed inverted index.
+
+    Postings for term t are docs[offsets[t]:offsets[t + 1]] with matching
+    term frequencies in tfs; documents are addressed by position, and
+    doc_ids maps a position to the vector store id.
+    """
+
+    FILES = ("offsets.npy", "docs.npy", "tfs.npy", "doc_len.npy")
+
+    def __init__(self, terms, offsets, docs, tfs, doc_len, doc_ids, k1: float = 1.2, b: float = 0.75):
+        self.term_ids = {term: i for i, term in enumerate(terms)}
+        self.offsets = offsets
+        self.docs = docs
+        self.tfs = tfs
+        self.doc_len = doc_len
+        self.doc_ids = doc_ids
+        self.k1 = k1
+        self.b = b
+        self.avg_len = float(doc_len.mean()) if len(doc_len) else 0.0
+
+    @classmethod
+    def build(cls, doc_ids, texts):
+        postings = {}
+        doc_len = np.zeros(len(texts), dtype=np.uint32)
+        for doc_index, text in enumerate(texts):
+            tokens = tokenize(text)
+            doc_len[doc_index] = len(tokens)
+            counts = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, count in counts.items():
+                postings.setdefault(token, []).append((doc_index, count))
+
+        terms = sorted(postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        for i, term in enumerate(terms):
+            offsets[i + 1] = offsets[i] + len(postings[term])
+        docs = np.empty(offsets[-1], dtype=np.uint32)
+        tfs = np.empty(offsets[-1], dtype=np.uint16)
+        for i, term in enumerate(terms):
+            entries = np.asarray(postings[term], dtype=np.int64)
+            docs[offsets[i]:offsets[i + 1]] = entries[:, 0]
+            tfs[offsets[i]:offsets[i + 1]] = np.minimum(entries[:, 1], np.iinfo(np.uint16).max)
+        return cls(terms, offsets, docs, tfs, doc_len, list(doc_ids))
+
+    def updated(self, removed_ids, doc_ids, texts):
+        """
+        A new index without `removed_ids` and with `texts` stored under
+        `doc_ids` (replacing any documents with those ids). Only the new
+        texts are tokenized; the kept postings are re-packed with array
+        operations, so the cost grows with the size of the index arrays
+        rather than with the text of the corpus.
+        """
+        added = type(self).build(doc_ids, texts)
+        dropped = set(removed_ids).union(added.doc_ids)
+        keep = np.fromiter((doc_id not in dropped for doc_id in self.doc_ids), dtype=bool, count=len(self.doc_ids))
+        new_position = np.cumsum(keep) - 1
+        kept = int(keep.sum())
+
+        old_terms = sorted(self.term_ids, key=self.term_ids.get)
+        vocabulary = sorted(set(old_terms).union(added.term_ids))
+        position = {term: i for i, term in enumerate(vocabulary)}
+        old_map = np.fromiter((position[term] for term in old_terms), dtype=np.int64, count=len(old_terms))
+        new_map = np.fromiter(
+            (position[term] for term in sorted(added.term_ids, key=added.term_ids.get)),
+            dtype=np.int64, count=len(added.term_ids),
+        )
+
+        old_term_of = np.repeat(np.arange(len(old_terms)), np.diff(self.offsets))
+        old_mask = keep[self.docs]
+        new_term_of = np.repeat(np.arange(len(added.term_ids)), np.diff(added.offsets))
+        terms = np.concatenate([old_map[old_term_of[old_mask]], new_map[new_term_of]])
+        docs = np.concatenate([new_position[self.docs[old_mask]], added.docs.astype(np.int64) + kept])
+        tfs = np.concatenate([self.tfs[old_mask], added.tfs])
+        order = np.lexsort((docs, terms))
+
+        # Terms left without postings are dropped from the vocabulary.
+        counts = np.bincount(terms, minlength=len(vocabulary))
+        used = counts > 0
+        offsets = np.zeros(int(used.sum()) + 1, dtype=np.int64)
+        np.cumsum(counts[used], out=offsets[1:])
+        return type(self)(
+            [term for term, is_used in zip(vocabulary, used) if is_used],
+            offsets,
+            docs[order].astype(np.uint32),
+            tfs[order].astype(np.uint16),
+            np.concatenate([self.doc_len[keep], added.doc_len]).astype(np.uint32),
+            [doc_id for doc_id, is_kept in zip(self.doc_ids, keep) if is_kept] + added.doc_ids,
+            self.k1,
+            self.b,
+        )
+
+    @classmethod
+    def build_from_collection(cls, collection, page_size: int = 5000):
+        """Builds the index from every document stored in a Chroma collection."""
+        doc_ids, texts = [], []
+        offset = 0
+        while True:
+            page = collection.get(include=["documents"], limit=page_size, offset=offset)
+            if not page["ids"]:
+                break
+            doc_ids.extend(page["ids"])
+            texts.extend(page["documents"])
+            offset += len(page["ids"])
+        return cls.build(doc_ids, texts)
+
+    def save(self, directory):
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for name, array in zip(self.FILES, (self.offsets, self.docs, self.tfs, self.doc_len)):
+            np.save(directory / name, array)
+        terms = sorted(self.term_ids, key=self.term_ids.get)
+        with open(directory / "meta.json", "w", encoding="utf-8") as f:
+            json.dump({"terms": terms, "doc_ids": self.doc_ids}, f)
+
+    @classmethod
+    def load(cls, directory):
+        directory = Path(directory)
+        arrays = [np.load(directory / name, mmap_mode="r") for name in cls.FILES]
+        with open(directory / "meta.json", encoding="utf-8") as f:
+            meta = json.load(f)
+        return cls(meta["terms"], *arrays, meta["doc_ids"])
+
+    @staticmethod
+    def exists(directory) -> bool:
+        return (Path(directory) / "meta.json").exists()
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def covers(self, query: str) -> bool:
+        """True when the query has tokens and every one of them is in the vocabulary."""
+        tokens = tokenize(query)
+        return bool(tokens) and all(token in self.term_ids for token in tokens)
+
+    def is_keyword_query(self, query: str, max_words: int = 3) -> bool:
+        """Short, fully in-vocabulary queries ("FIR", "RTI fees") that BM25 alone answers well."""
+        return len(query.split()) <= max_words and self.covers(query)
+
+    def search(self, query: str, k: int = 5):
+        """Returns up to k (doc_index, score) pairs, best first."""
+        n = len(self.doc_ids)
+        if n == 0:
+            return []
+        scores = np.zeros(n, dtype=np.float32)
+        norm = self.k1 * (1 - self.b + self.b * self.doc_len / max(self.avg_len, 1e-9))
+        for token in set(tokenize(query)):
+            term = self.term_ids.get(token)
+            if term is None:
+                continue
+            start, end = self.offsets[term], self.offsets[term + 1]
+            docs = self.docs[start:end]
+            tfs = self.tfs[start:end].astype(np.float32)
+            df = end - start
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            scores[docs] += idf * tfs * (self.k1 + 1) / (tfs + norm[docs])
+
+        k = min(k, n)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(i), float(scores[i])) for i in top if scores[i] > 0]
+
+    def search_ids(self, query: str, k: int = 5):
+        """Vector store ids of up to k best matches, best first."""
+        return [self.doc_ids[i] for i, _ in self.search(query, k)]
+
+
+def reciprocal_rank_fusion(*rankings, k: int = 60):
+    """Fuses ranked lists of hashable items; items ranked high in several lists win."""
+    scores = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores, key=scores.get, reverse=True)
@@ -0,0 +1,282 @@
+"""
+Incremental bulk ingestion into the Chroma store.
+
+Streams PDF/TXT/JSONL files, splits them into overlapping chunks, embeds
+new chunks in large batches on a process pool and upserts them under
+content-hash IDs. The BM25 index used by hybrid retrieval is updated at
+the end of every run that changed the store: only the added chunks are
+tokenized. A manifest next to the store remembers each file's hash
+and chunk IDs, so re-runs skip unchanged files, only embed the chunks that
+actually changed, and remove chunks of files that have disappeared.
+
+    cd backend && python ingest.py ../corpus --chunk-size 1000 --chunk-overlap 200
+
+Running API workers keep their loaded index; restart them after a run.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from pathlib import Path
+import argparse
+import hashlib
+import json
+import logging
+import multiprocessing
+import sqlite3
+
+from RAG import EMBEDDING_MODEL, PERSIST_DIR, RAGEngine
+
+SUPPORTED_SUFFIXES = {".pdf", ".txt", ".jsonl"}
+MANIFEST_NAME = "ingest_manifest.db"
+
+
+# ---- Reading ---- #
+def iter_source_files(paths):
+    for path in (Path(p).resolve() for p in paths):
+        if path.is_dir():
+            for child in sorted(path.rglob("*")):
+                if child.is_file() and child.suffix.lower() in SUPPORTED_SUFFIXES:
+                    yield child
+        elif path.suffix.lower() in SUPPORTED_SUFFIXES:
+            yield path
+
+
+def file_hash(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def iter_records(path: Path):
+    """Yields (record_key, text, metadata) for every document in a file."""
+    suffix = path.suffix.lower()
+    if suffix == ".txt":
+        yield "", path.read_text(encoding="utf-8", errors="ignore"), {}
+    elif suffix == ".jsonl":
+        with open(path, encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                text = record.pop("text", "") or record.pop("page_content", "")
+                key = str(record.pop("id", line_no))
+                metadata = {k: v for k, v in record.items() if isinstance(v, (str, int, float, bool))}
+                yield key, text, metadata
+    elif suffix == ".pdf":
+        try:
+            from pypdf import PdfReader
+        except ImportError:
+            raise RuntimeError("PDF ingestion needs the 'pypdf' package")
+        for page_no, page in enumerate(PdfReader(str(path)).pages, 1):
+            yield f"page-{page_no}", page.extract_text() or "", {"page": page_no}
+
+
+def chunk_text(text: str, chunk_size: int = 1000, overlap: int = 200):
+    """Splits text into ~chunk_size character windows overlapping by `overlap`, on word boundaries."""
+    text = " ".join(text.split())
+    start = 0
+    while start < len(text):
+        end = min(start + chunk_size, len(text))
+        if end < len(text):
+            space = text.rfind(" ", start + overlap + 1, end)
+            if space != -1:
+                end = space
+        yield text[start:end].strip()
+        if end >= len(text):
+            break
+        start = end - overlap
+        if text[start - 1] != " ":
+            next_space = text.find(" ", start, end)
+            if next_space != -1:
+                start = next_space + 1
+
+
+def iter_chunks(path: Path, chunk_size: int, overlap: int):
+    """Yields (chunk_id, text, metadata) for a file; IDs hash the file, record and chunk text."""
+    for key, text, metadata in iter_records(path):
+        for index, chunk in enumerate(chunk_text(text, chunk_size, overlap)):
+            if not chunk:
+                continue
+            chunk_id = hashlib.sha256(f"{path}\0{key}\0{chunk}".encode("utf-8")).hexdigest()
+            yield chunk_id, chunk, {**metadata, "source": str(path), "record": key, "chunk": index}
+
+
+# ---- Manifest ---- #
+class Manifest:
+    """SQLite record of which files (by hash) produced which chunk IDs."""
+
+    def __init__(self, path: Path):
+        self.db = sqlite3.connect(path)
+        self.db.execute("CREATE TABLE IF NOT EXISTS source (path TEXT PRIMARY KEY, file_hash TEXT NOT NULL)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS chunk (chunk_id TEXT PRIMARY KEY, path TEXT NOT NULL)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS ix_chunk_path ON chunk (path)")
+
+    def file_hash(self, path: str):
+        row = self.db.execute("SELECT file_hash FROM source WHERE path = ?", (path,)).fetchone()
+        return row[0] if row else None
+
+    def chunk_ids(self, path: str) -> set:
+        return {row[0] for row in self.db.execute("SELECT chunk_id FROM chunk WHERE path = ?", (path,))}
+
+    def paths(self):
+        return [row[0] for row in self.db.execute("SELECT path FROM source")]
+
+    def record(self, path: str, digest: str, chunk_ids):
+        self.db.execute("DELETE FROM chunk WHERE path = ?", (path,))
+        self.db.executemany("INSERT OR REPLACE INTO chunk (chunk_id, path) VALUES (?, ?)", [(c, path) for c in chunk_ids])
+        self.db.execute("INSERT OR REPLACE INTO source (path, file_hash) VALUES (?, ?)", (path, digest))
+        self.db.commit()
+
+    def forget(self, path: str):
+        self.db.execute("DELETE FROM chunk WHERE path = ?", (path,))
+        self.db.execute("DELETE FROM source WHERE path = ?", (path,))
+        self.db.commit()
+
+
+# ---- Embedding workers ---- #
+_worker_model = None
+
+def _init_worker(model_name: str):
+    global _worker_model
+    from langchain_huggingface import HuggingFaceEmbeddings
+    _worker_model = HuggingFaceEmbeddings(model_name=model_name)
+
+def _embed_batch(texts):
+    import numpy as np
+    return np.asarray(_worker_model.embed_documents(texts), dtype=np.float32)
+
+
+# ---- Pipeline ---- #
+class Ingestor:
+    def __init__(self, persist_dir: str = PERSIST_DIR, chunk_size: int = 1000, overlap: int = 200,
+                 batch_size: int = 256, workers: int = 2):
+        if overlap >= chunk_size:
+            raise ValueError("chunk overlap must be smaller than the chunk size")
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self.batch_size = batch_size
+        self.workers = workers
+        # A new store starts empty instead of with the demo documents.
+        self.engine = RAGEngine(persist_dir, seed_documents=())
+        self.collection = self.engine.collection
+        self.manifest = Manifest(Path(persist_dir) / MANIFEST_NAME)
+        self._finished_files = []
+        # The run's changes to the store, applied to the BM25 index at the end.
+        self._added = {}
+        self._removed = set()
+        self.stats = {"files_skipped": 0, "files_indexed": 0, "files_removed": 0, "chunks_added": 0, "chunks_deleted": 0}
+
+    def _bulk(self):
+        """Groups writes into one when the store supports it (the quantized store rewrites its files per write)."""
+        bulk = getattr(self.collection, "bulk", None)
+        return bulk() if bulk is not None else nullcontext()
+
+    def _delete(self, chunk_ids):
+        chunk_ids = list(chunk_ids)
+        for start in range(0, len(chunk_ids), self.batch_size):
+            self.collection.delete(ids=chunk_ids[start:start + self.batch_size])
+        for chunk_id in chunk_ids:
+            self._added.pop(chunk_id, None)
+        self._removed.update(chunk_ids)
+        self.stats["chunks_deleted"] += len(chunk_ids)
+
+    def _iter_pending(self, files):
+        """Yields chunks that need embedding; deletes stale chunks and queues manifest updates on the way."""
+        for path in files:
+            key = str(path)
+            digest = file_hash(path)
+            if self.manifest.file_hash(key) == digest:
+                self.stats["files_skipped"] += 1
+                continue
+            old_ids = self.manifest.chunk_ids(key)
+            new_ids = {}
+            for chunk_id, text, metadata in iter_chunks(path, self.chunk_size, self.overlap):
+                # Text repeated within a file hashes to the same ID; the store
+                # rejects a batch that names an ID twice, so keep the first.
+                if chunk_id in new_ids:
+                    continue
+                new_ids[chunk_id] = None
+                if chunk_id not in old_ids:
+                    yield chunk_id, text, metadata
+            self._delete(old_ids - new_ids.keys())
+            # Recorded only after every batch is upserted, so an interrupted
+            # run re-processes the file instead of leaving it half indexed.
+            self._finished_files.append((key, digest, list(new_ids)))
+            self.stats["files_indexed"] += 1
+
+    def _iter_batches(self, files):
+        batch = []
+        for item in self._iter_pending(files):
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _upsert(self, batch, vectors):
+        ids, texts, metadatas = zip(*batch)
+        self.collection.upsert(ids=list(ids), embeddings=vectors.tolist(), documents=list(texts), metadatas=list(metadatas))
+        self._added.update(zip(ids, texts))
+        self.stats["chunks_added"] += len(ids)
+
+    def run(self, paths, prune: bool = True) -> dict:
+        files = list(iter_source_files(paths))
+        seen = {str(path) for path in files}
+
+        # Spawned workers each load their own copy of the model; at most
+        # 2 * workers batches are in flight so memory stays bounded.
+        context = multiprocessing.get_context("spawn")
+        with self._bulk(), ProcessPoolExecutor(max_workers=self.workers, mp_context=context,
+                                               initializer=_init_worker, initargs=(EMBEDDING_MODEL,)) as pool:
+            in_flight = []
+            for batch in self._iter_batches(files):
+                in_flight.append((batch, pool.submit(_embed_batch, [text for _, text, _ in batch])))
+                if len(in_flight) >= 2 * self.workers:
+                    done_batch, future = in_flight.pop(0)
+                    self._upsert(done_batch, future.result())
+            for done_batch, future in in_flight:
+                self._upsert(done_batch, future.result())
+        for key, digest, chunk_ids in self._finished_files:
+            self.manifest.record(key, digest, chunk_ids)
+        self._finished_files = []
+
+        if prune:
+            roots = [str(Path(p).resolve()) for p in paths]
+            removed = [
+                path for path in self.manifest.paths()
+                if path not in seen and any(path == root or path.startswith(root.rstrip("/") + "/") for root in roots)
+            ]
+            with self._bulk():
+                for path in removed:
+                    self._delete(self.manifest.chunk_ids(path))
+            for path in removed:
+                self.manifest.forget(path)
+                self.stats["files_removed"] += 1
+
+        if any(self.stats[key] for key in ("files_indexed", "files_removed")):
+            self.engine.update_lexical_index(self._removed, list(self._added), list(self._added.values()))
+        self._added, self._removed = {}, set()
+        return self.stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+", help="Files or directories to ingest")
+    parser.add_argument("--persist-dir", default=PERSIST_DIR)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--no-prune", action="store_true", help="Keep chunks of files that no longer exist")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    ingestor = Ingestor(args.persist_dir, args.chunk_size, args.chunk_overlap, args.batch_size, args.workers)
+    stats = ingestor.run(args.paths, prune=not args.no_prune)
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,351 @@
+"""
+Resilient access to the chat model.
+
+LLMGateway wraps one or more model tiers (e.g. the primary model and a
+faster, cheaper fallback) behind the invoke/ainvoke/astream surface of a
+LangChain chat model. Each call gets:
+
+- deadlines: a per-attempt timeout, a first-token timeout for streams and
+  an overall deadline across retries and tiers;
+- hedging: if an attempt has not answered (or, for streams, produced its
+  first token) within the tier's recent p95, a second identical request
+  is sent and whichever finishes first wins. Hedges are capped at a
+  fraction of calls so a slow backend is not hit twice as hard;
+- retries: a bounded number per tier, with exponential backoff and full
+  jitter;
+- a circuit breaker per tier: after repeated failures the tier is skipped
+  until a cool-down passes, then one trial call is let through;
+- fallback: tiers are tried in order; LLMUnavailable is raised when all
+  of them fail, so the caller can fall back further (RAG answers from the
+  retrieved snippets).
+
+A stream that fails after its first token cannot be retried without
+repeating text, so that error is raised to the caller.
+"""
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import asyncio
+import random
+import threading
+import time
+
+from metrics import registry
+
+LLM_EVENTS = registry.counter(
+    "llm_gateway_events_total",
+    "LLM gateway outcomes per tier: success, failure, timeout, retry, hedge, hedge_win, short_circuit, fallback.",
+    labels=("tier", "event"),
+)
+
+
+class LLMUnavailable(Exception):
+    """Every tier failed or is short-circuited."""
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures. Once `reset_after`
+    seconds have passed a single trial call is allowed (half-open); success
+    closes the breaker, failure keeps it open for another period.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_after: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if time.monotonic() - self.opened_at >= self.reset_after else "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.reset_after:
+                self.opened_at = time.monotonic()  # let this one trial through, hold the rest
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class LatencyTracker:
+    """Recent latencies of successful calls; percentile() is None until `min_samples` are seen."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self._samples = deque(maxlen=window)
+        self.min_samples = min_samples
+
+    def record(self, seconds: float):
+        self._samples.append(seconds)
+
+    def percentile(self, p: float):
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+
+class Tier:
+    """One model in the fallback chain; the model is created on first use."""
+
+    def __init__(self, name: str, factory, breaker: CircuitBreaker):
+        self.name = name
+        self._factory = factory
+        self._model = None
+        self._lock = threading.Lock()
+        self.breaker = breaker
+        self.latency = LatencyTracker()
+        self.first_token = LatencyTracker()
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = self._factory()
+        return self._model
+
+
+class LLMGateway:
+    """
+    `tiers` is a list of (name, zero-argument model factory), tried in order.
+    """
+
+    def __init__(self, tiers, timeout: float = 30.0, first_token_timeout: float = 10.0,
+                 deadline: float = 45.0, max_retries: int = 1, backoff_base: float = 0.2,
+                 backoff_cap: float = 2.0, hedge: bool = True, hedge_percentile: float = 95,
+                 hedge_min_delay: float = 0.05, hedge_budget: float = 0.1,
+                 breaker_failures: int = 5, breaker_reset: float = 30.0):
+        self.tiers = [Tier(name, factory, CircuitBreaker(breaker_failures, breaker_reset)) for name, factory in tiers]
+        self.timeout = timeout
+        self.first_token_timeout = first_token_timeout
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_budget = hedge_budget
+        self._calls = 0
+        self._hedges = 0
+        self._sync_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="llm")
+
+    def preload(self):
+        """Creates every tier's model client up front."""
+        for tier in self.tiers:
+            tier.model
+
+    # ---- Shared helpers ---- #
+    def _hedge_delay(self, tracker: LatencyTracker):
+        """Seconds to wait before hedging, or None when hedging is off, unprimed or over budget."""
+        if not self.hedge or self._hedges >= self.hedge_budget * self._calls + 1:
+            return None
+        p = tracker.percentile(self.hedge_percentile)
+        return None if p is None else max(p, self.hedge_min_delay)
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    def _event(self, tier: Tier, event: str):
+        LLM_EVENTS.inc(tier=tier.name, event=event)
+
+    def _fail(self, tier: Tier, error: Exception):
+        tier.breaker.record_failure()
+        self._event(tier, "timeout" if isinstance(error, (asyncio.TimeoutError, FutureTimeoutError)) else "failure")
+
+    def _available_tiers(self):
+        for index, tier in enumerate(self.tiers):
+            if not tier.breaker.allow():
+                self._event(tier, "short_circuit")
+                continue
+            if index > 0:
+                self._event(tier, "fallback")
+            yield tier
+
+    async def _race(self, tier: Tier, start_call, timeout: float, tracker: LatencyTracker):
+        """
+        Runs start_call() (returns an awaitable), hedging it once after the
+        tracker's p95. Returns the first successful result, or raises the
+        last error or asyncio.TimeoutError.
+        """
+        loop = asyncio.get_running_loop()
+        end = loop.time() + timeout
+        first = asyncio.ensure_future(start_call())
+        tasks = [first]
+        self._calls += 1
+        try:
+            delay = self._hedge_delay(tracker)
+            if delay is not None and delay < timeout:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done:
+                    self._hedges += 1
+                    self._event(tier, "hedge")
+                    tasks.append(asyncio.ensure_future(start_call()))
+            error = None
+            while tasks:
+                remaining = end - loop.time()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError()
+                done, _ = await asyncio.wait(tasks, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    raise asyncio.TimeoutError()
+                for task in done:
+                    tasks.remove(task)
+                    if task.exception() is None:
+                        if task is not first:
+                            self._event(tier, "hedge_win")
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    # ---- Non-streaming ---- #
+    async def ainvoke(self, prompt, **kwargs):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.deadline
+        error = None
+        for tier in self._available_tiers():
+            for attempt in range(self.max_retries + 1):
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    raise LLMUnavailable(f"LLM deadline of {self.deadline}s exceeded") from error
+                start = loop.time()
+                try:
+                    result = await self._race(tier, lambda: tier.model.ainvoke(prompt, **kwargs), min(self.timeout, remaining), tier.latency)
+                except Exception as e:
+                    error = e
+                    self._fail(tier, e)
+                    if attempt == self.max_retries or tier.breaker.state != "closed":
+                        break
+                    self._event(tier, "retry")
+                    await asyncio.sleep(min(self._backoff(attempt), max(0.0, deadline - loop.time())))
+                    continue
+                tier.latency.record(loop.time() - start)
+                tier.breaker.record_success()
+                self._event(tier, "success")
+                return result
+        raise LLMUnavailable("all LLM tiers failed") from error
+
+    def invoke(self, prompt, **kwargs):
+        """Blocking variant: deadlines, retries, breaker and tiers, without hedging."""
+        deadline = time.monotonic() + self.deadline
+        error = None
+        for tier in self._available_tiers():
+            for attempt in range(self.max_retries + 1):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise LLMUnavailable(f"LLM deadline of {self.deadline}s exceeded") from error
+                start = time.monotonic()
+                try:
+                    # A timed-out call keeps its pool thread until the client gives up.
+                    result = self._sync_pool.submit(tier.model.invoke, prompt, **kwargs).result(timeout=min(self.timeout, remaining))
+                except Exception as e:
+                    error = e
+                    self._fail(tier, e)
+                    if attempt == self.max_retries or tier.breaker.state != "closed":
+                        break
+                    self._event(tier, "retry")
+                    time.sleep(min(self._backoff(attempt), max(0.0, deadline - time.monotonic())))
+                    continue
+                tier.latency.record(time.monotonic() - start)
+                tier.breaker.record_success()
+                self._event(tier, "success")
+                return result
+        raise LLMUnavailable("all LLM tiers failed") from error
+
+    # ---- Streaming ---- #
+    async def _open_stream(self, tier: Tier, prompt, timeout: float, **kwargs):
+        """Starts a stream (hedged on the first token) and returns (stream, first chunk or None)."""
+        streams = []
+
+        async def start():
+            stream = tier.model.astream(prompt, **kwargs)
+            streams.append(stream)
+            try:
+                return stream, await stream.__anext__()
+            except StopAsyncIteration:
+                return stream, None
+
+        try:
+            stream, first_chunk = await self._race(tier, start, timeout, tier.first_token)
+        except BaseException:
+            for stream in streams:
+                await _close(stream)
+            raise
+        for other in streams:
+            if other is not stream:
+                await _close(other)
+        return stream, first_chunk
+
+    async def astream(self, prompt, **kwargs):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.deadline
+        error = None
+        for tier in self._available_tiers():
+            for attempt in range(self.max_retries + 1):
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    raise LLMUnavailable(f"LLM deadline of {self.deadline}s exceeded") from error
+                start = loop.time()
+                try:
+                    stream, first_chunk = await self._open_stream(tier, prompt, min(self.first_token_timeout, remaining), **kwargs)
+                except Exception as e:
+                    error = e
+                    self._fail(tier, e)
+                    if attempt == self.max_retries or tier.breaker.state != "closed":
+                        break
+                    self._event(tier, "retry")
+                    await asyncio.sleep(min(self._backoff(attempt), max(0.0, deadline - loop.time())))
+                    continue
+
+                tier.first_token.record(loop.time() - start)
+                try:
+                    if first_chunk is not None:
+                        yield first_chunk
+                        while True:
+                            remaining = deadline - loop.time()
+                            try:
+                                chunk = await asyncio.wait_for(stream.__anext__(), max(remaining, 0.001))
+                            except StopAsyncIteration:
+                                break
+                            yield chunk
+                except Exception as e:
+                    self._fail(tier, e)
+                    raise
+                finally:
+                    await _close(stream)
+                tier.breaker.record_success()
+                self._event(tier, "success")
+                return
+        raise LLMUnavailable("all LLM tiers failed") from error
+
+    def stats(self) -> dict:
+        out = {"calls": self._calls, "hedges": self._hedges}
+        for tier in self.tiers:
+            out[f"{tier.name}_breaker_open"] = int(tier.breaker.state != "closed")
+        return out
+
+
+async def _close(stream):
+    try:
+        await stream.aclose()
+    except Exception:
+        pass
@@ -0,0 +1,122 @@
+"""
+Conversation memory for follow-up questions.
+
+A session's memory is a rolling summary plus its most recent turns. The
+recent turns included in a prompt are capped both by count and by an
+estimated token budget, so prompt size stays bounded however long the
+session gets. Turns that fall out of that window are folded into the
+summary a few at a time (previous summary + new turns -> new summary);
+the summary is never rebuilt from the full history.
+
+Storage is the caller's concern: this module only decides what goes in
+the prompt and produces updated summaries.
+"""
+import logging
+import re
+
+# Words, digits and punctuation roughly as a BPE/SentencePiece tokenizer
+# splits them: common words are one token, long words a few.
+_TOKEN_RE = re.compile(r"[^\W\d_]+|\d|[^\w\s]|_")
+
+
+def estimate_tokens(text: str) -> int:
+    """Fast token count estimate; no model tokenizer is loaded."""
+    count = 0
+    for piece in _TOKEN_RE.findall(text):
+        count += 1 + (len(piece) - 1) // 6 if piece[0].isalpha() else 1
+    return count
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Cuts text at a word boundary so that it fits in about max_tokens."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    kept, used = [], 0
+    for word in text.split():
+        used += estimate_tokens(word)
+        if used > max_tokens:
+            break
+        kept.append(word)
+    return " ".join(kept) + " ..."
+
+
+def format_turn(user_message: str, bot_response: str) -> str:
+    return f"User: {user_message}\nAssistant: {bot_response}"
+
+
+SUMMARY_PROMPT = """Update the running summary of a conversation between a user and a legal assistant.
+Keep the facts about the user's situation, what they asked and the key advice given.
+Write at most {max_words} words of plain text.
+
+Current summary:
+{summary}
+
+New exchanges:
+{turns}
+
+Updated summary:"""
+
+
+class ConversationMemory:
+    """
+    `max_turns` recent turns within `history_tokens` go into the prompt
+    verbatim; older turns live on in a summary of at most `summary_tokens`.
+    Recent answers are clipped to `turn_tokens` so one long answer cannot
+    crowd out the rest.
+    """
+
+    def __init__(self, max_turns: int = 6, history_tokens: int = 800,
+                 summary_tokens: int = 250, turn_tokens: int = 300):
+        self.max_turns = max_turns
+        self.history_tokens = history_tokens
+        self.summary_tokens = summary_tokens
+        self.turn_tokens = turn_tokens
+
+    def select(self, turns):
+        """
+        Splits unsummarized turns (oldest first, (user, bot) pairs) into
+        (recent, overflow): the newest turns that fit the window, and the
+        older ones that should be folded into the summary.
+        """
+        recent, used = [], 0
+        for user_message, bot_response in reversed(turns):
+            if len(recent) >= self.max_turns:
+                break
+            cost = estimate_tokens(user_message) + min(estimate_tokens(bot_response), self.turn_tokens)
+            if recent and used + cost > self.history_tokens:
+                break
+            recent.append((user_message, bot_response))
+            used += cost
+        recent.reverse()
+        return recent, turns[:len(turns) - len(recent)]
+
+    def render(self, summary: str, recent) -> str:
+        """The history block for the prompt; empty for a new session."""
+        parts = []
+        if summary:
+            parts.append(f"Summary of earlier conversation: {summary}")
+        for user_message, bot_response in recent:
+            parts.append(format_turn(user_message, truncate_tokens(bot_response, self.turn_tokens)))
+        return "\n\n".join(parts)
+
+    async def fold(self, llm, summary: str, turns) -> str:
+        """
+        Returns a summary covering `summary` plus `turns`. Uses the LLM when
+        available and falls back to keeping the questions asked.
+        """
+        max_words = int(self.summary_tokens * 0.75)
+        new_turns = "\n\n".join(format_turn(u, truncate_tokens(b, self.turn_tokens)) for u, b in turns)
+        if llm is not None:
+            try:
+                prompt = SUMMARY_PROMPT.format(max_words=max_words, summary=summary or "(none)", turns=new_turns)
+                response = await llm.ainvoke(prompt)
+                return truncate_tokens(response.content.strip(), self.summary_tokens)
+            except Exception as e:
+                logging.error(f"Summary update error: {e}")
+        asked = "; ".join(user_message for user_message, _ in turns)
+        combined = f"{summary} The user also asked: {asked}." if summary else f"The user asked: {asked}."
+        # Keep the newest part when the fallback summary outgrows its budget.
+        words = combined.split()
+        while estimate_tokens(" ".join(words)) > self.summary_tokens and len(words) > 1:
+            words = words[len(words) // 4 or 1:]
+        return " ".join(words)
@@ -0,0 +1,179 @@
+"""
+Minimal Prometheus-style metrics: counters, histograms and callback
+gauges, rendered in the text exposition format by `registry.render()`.
+"""
+from contextlib import contextmanager
+from pathlib import Path
+import bisect
+import logging
+import random
+import re
+import threading
+import time
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"') for _, v in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(labels.get(name, "") for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, _format_labels(self.label_names, key), value) for key, value in self._values.items()]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(name, "") for name in self.label_names)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        out = []
+        with self._lock:
+            for key, (counts, total, count) in self._series.items():
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    out.append((f"{self.name}_bucket", _format_labels(self.label_names, key, ("le", le)), cumulative))
+                labels = _format_labels(self.label_names, key)
+                out.append((f"{self.name}_sum", labels, total))
+                out.append((f"{self.name}_count", labels, count))
+        return out
+
+
+class CallbackGauge:
+    """Gauge whose labelled values are read from a callback at scrape time."""
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, label: str, callback):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.callback = callback
+
+    def samples(self):
+        return [(self.name, _format_labels((self.label,), (key,)), value) for key, value in self.callback().items()]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labels=()):
+        return self._add(Counter(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def gauge_callback(self, name, help, label, callback):
+        return self._add(CallbackGauge(name, help, label, callback))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+STAGE_SECONDS = registry.histogram(
+    "chat_stage_duration_seconds",
+    "Time spent in each stage of request handling.",
+    labels=("stage",),
+)
+REQUEST_SECONDS = registry.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency until the response headers are sent.",
+    labels=("method", "route", "status"),
+)
+
+
+@contextmanager
+def stage_timer(stage: str):
+    """Records the wall time of the enclosed block under chat_stage_duration_seconds{stage=...}."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage)
+
+
+class RequestProfiler:
+    """
+    Opt-in sampling profiler. A `sample_rate` fraction of requests is run
+    under pyinstrument (async-aware, optional dependency) and an HTML report
+    per profiled request is written to `output_dir`.
+    """
+
+    def __init__(self, sample_rate: float = 0.0, output_dir: str = "profiles"):
+        self.sample_rate = sample_rate
+        self.output_dir = Path(output_dir)
+
+    def start(self):
+        """Returns a running profiler for a sampled request, otherwise None."""
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return None
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            logging.error("Request profiling needs the 'pyinstrument' package; disabling it")
+            self.sample_rate = 0.0
+            return None
+        profiler = Profiler(async_mode="enabled")
+        profiler.start()
+        return profiler
+
+    def stop(self, profiler, label: str):
+        profiler.stop()
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        name = re.sub(r"[^A-Za-z0-9_.-]+", "_", label).strip("_")
+        path = self.output_dir / f"{int(time.time() * 1000)}-{name}.html"
+        path.write_text(profiler.output_html(), encoding="utf-8")
@@ -0,0 +1,548 @@
+"""
+Compact in-process vector store.
+
+Embeddings are unit-normalised and kept quantized (int8 with a per-row
+scale, or float16) in .npy files that are memory-mapped read-only, so
+every worker process on a host shares the same page-cache pages instead
+of holding its own copy. Search is a blocked matrix product over the
+quantized rows followed by a top-k partition; the best candidates can be
+rescored against a float32 copy (also memory-mapped, so only the touched
+rows are read). For large corpora an optional IVF layer clusters the rows
+with spherical k-means and scans only the `nprobe` nearest clusters.
+
+Rows live in immutable segment directories. Ids, texts and metadata are
+stored there too, as one UTF-8 blob plus offsets per field, memory-mapped
+like the vectors and decoded one row at a time, so they stay out of the
+worker heap. manifest.json names the live segments and a mask of deleted
+rows; a write adds files and then replaces the manifest in one rename, so
+a reader sees either the old store or the new one. Writes outside bulk()
+append a segment (and mark replaced rows deleted) instead of rewriting the
+store; bulk() and every MAX_SEGMENTS-th write compact it into one segment.
+
+QuantizedVectorStore is a LangChain VectorStore (as_retriever() etc. work)
+and also exposes the subset of the Chroma collection API the app uses
+(get/query/upsert/delete/count), so ingestion and the BM25 index builder
+work against either backend.
+"""
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager
+from pathlib import Path
+import json
+import os
+import shutil
+import threading
+import uuid
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+DTYPES = {"int8": np.int8, "float16": np.float16}
+BLOCK_ROWS = 8192
+MANIFEST_NAME = "manifest.json"
+# Segments a store may have before a write compacts them into one.
+MAX_SEGMENTS = 8
+
+
+def _unit(matrix) -> np.ndarray:
+    matrix = np.atleast_2d(np.asarray(matrix, dtype=np.float32))
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def quantize(unit_rows, dtype: str):
+    """Returns (codes, scales); scales is None for float16."""
+    if dtype == "float16":
+        return unit_rows.astype(np.float16), None
+    scales = np.abs(unit_rows).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(unit_rows / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def spherical_kmeans(unit_rows, n_lists: int, iterations: int = 10, seed: int = 0):
+    """Cluster centroids (unit vectors) and the list each row belongs to."""
+    rng = np.random.default_rng(seed)
+    n_lists = min(n_lists, len(unit_rows))
+    centroids = unit_rows[rng.choice(len(unit_rows), n_lists, replace=False)].copy()
+    for _ in range(iterations):
+        assign = np.concatenate([
+            np.argmax(unit_rows[start:start + BLOCK_ROWS] @ centroids.T, axis=1)
+            for start in range(0, len(unit_rows), BLOCK_ROWS)
+        ])
+        for i in range(n_lists):
+            members = unit_rows[assign == i]
+            if len(members):
+                centroids[i] = members.sum(axis=0)
+        centroids = _unit(centroids)
+    return centroids, assign
+
+
+class _Strings:
+    """A list of strings stored as one memory-mapped UTF-8 blob and int64 offsets."""
+
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    @staticmethod
+    def save(directory: Path, name: str, strings):
+        encoded = [string.encode("utf-8") for string in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(data) for data in encoded], out=offsets[1:])
+        np.save(directory / f"{name}.npy", np.frombuffer(b"".join(encoded), dtype=np.uint8))
+        np.save(directory / f"{name}_offsets.npy", offsets)
+
+    @classmethod
+    def load(cls, directory: Path, name: str):
+        return cls(np.load(directory / f"{name}.npy", mmap_mode="r"), np.load(directory / f"{name}_offsets.npy", mmap_mode="r"))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return bytes(self.blob[self.offsets[i]:self.offsets[i + 1]]).decode("utf-8")
+
+
+class _Segment:
+    """
+    One immutable directory of rows: quantized codes, the optional float32
+    copy and IVF lists, and the ids (with their sort order, for lookups),
+    documents and JSON metadata.
+    """
+
+    ARRAYS = ("codes", "scales", "full", "centroids", "list_offsets", "id_order")
+
+    def __init__(self, path: Path):
+        self.path = path
+        for name in self.ARRAYS:
+            array_path = path / f"{name}.npy"
+            setattr(self, name, np.load(array_path, mmap_mode="r") if array_path.exists() else None)
+        self.ids = _Strings.load(path, "ids")
+        self.documents = _Strings.load(path, "documents")
+        self._metadatas = _Strings.load(path, "metadatas")
+        self.size = len(self.ids)
+
+    @classmethod
+    def write(cls, path: Path, ids, documents, metadatas, unit_rows, dtype: str, rescore: bool, n_lists: int):
+        path.mkdir(parents=True)
+        arrays = {}
+        if n_lists and len(ids) > n_lists:
+            centroids, assign = spherical_kmeans(unit_rows, n_lists)
+            order = np.argsort(assign, kind="stable")
+            unit_rows = unit_rows[order]
+            ids, documents, metadatas = ([seq[i] for i in order] for seq in (ids, documents, metadatas))
+            arrays["centroids"] = centroids
+            arrays["list_offsets"] = np.searchsorted(assign[order], np.arange(len(centroids) + 1)).astype(np.int64)
+        arrays["codes"], scales = quantize(unit_rows, dtype)
+        if scales is not None:
+            arrays["scales"] = scales
+        if rescore:
+            arrays["full"] = unit_rows.astype(np.float32)
+        arrays["id_order"] = np.argsort(np.asarray(ids, dtype=str), kind="stable").astype(np.int64)
+        for name, array in arrays.items():
+            np.save(path / f"{name}.npy", array)
+        _Strings.save(path, "ids", ids)
+        _Strings.save(path, "documents", documents)
+        _Strings.save(path, "metadatas", [json.dumps(metadata) for metadata in metadatas])
+        return cls(path)
+
+    def metadata(self, i: int):
+        return json.loads(self._metadatas[i])
+
+    def find(self, doc_id: str) -> int:
+        """Row of `doc_id` in this segment, or -1."""
+        position = bisect_left(range(self.size), doc_id, key=lambda j: self.ids[self.id_order[j]])
+        if position < self.size and self.ids[self.id_order[position]] == doc_id:
+            return int(self.id_order[position])
+        return -1
+
+    def rows(self, indices) -> np.ndarray:
+        """float32 unit rows (exact when a float32 copy is kept, otherwise dequantized)."""
+        if self.full is not None:
+            return np.asarray(self.full[indices], dtype=np.float32)
+        rows = np.asarray(self.codes[indices], dtype=np.float32)
+        if self.scales is not None:
+            rows *= self.scales[indices][:, None]
+        return rows
+
+    def _score_range(self, queries, start: int, end: int) -> np.ndarray:
+        """Approximate scores of rows [start, end) for every query: (rows, queries)."""
+        block = np.asarray(self.codes[start:end], dtype=np.float32)
+        scores = block @ queries.T
+        if self.scales is not None:
+            scores *= np.asarray(self.scales[start:end])[:, None]
+        return scores
+
+    def _candidates(self, queries, fetch: int, nprobe: int, deleted):
+        """Per query, the row indices of the `fetch` best approximate scores; deleted rows score -inf."""
+        n = self.size
+        if self.centroids is None:
+            scores = np.concatenate([self._score_range(queries, s, min(s + BLOCK_ROWS, n)) for s in range(0, n, BLOCK_ROWS)])
+            if deleted is not None:
+                scores[deleted] = -np.inf
+            fetch = min(fetch, n)
+            top = np.argpartition(-scores, fetch - 1, axis=0)[:fetch].T
+            return [(row, scores[row, q]) for q, row in enumerate(top)]
+
+        out = []
+        list_scores = queries @ np.asarray(self.centroids).T
+        for q, query in enumerate(queries):
+            probes = np.argsort(-list_scores[q])[:nprobe]
+            ranges = [(int(self.list_offsets[p]), int(self.list_offsets[p + 1])) for p in probes]
+            rows = np.concatenate([np.arange(s, e) for s, e in ranges]) if ranges else np.zeros(0, dtype=np.int64)
+            if len(rows) == 0:
+                out.append((rows, np.zeros(0, dtype=np.float32)))
+                continue
+            scores = np.concatenate([self._score_range(query[None, :], s, e)[:, 0] for s, e in ranges])
+            if deleted is not None:
+                scores[deleted[rows]] = -np.inf
+            keep = np.argpartition(-scores, min(fetch, len(rows)) - 1)[:fetch]
+            out.append((rows[keep], scores[keep]))
+        return out
+
+    def search(self, queries, k: int, rescore_factor: int, nprobe: int, deleted=None):
+        """Top-k (row, cosine score) pairs per query, best first, skipping rows marked in `deleted`."""
+        fetch = k * rescore_factor if self.full is not None else k
+        results = []
+        for q, (rows, scores) in enumerate(self._candidates(queries, fetch, nprobe, deleted)):
+            live = np.isfinite(scores)
+            rows, scores = rows[live], scores[live]
+            if self.full is not None and len(rows):
+                rows = np.sort(rows)
+                scores = np.asarray(self.full[rows], dtype=np.float32) @ queries[q]
+            order = np.argsort(-scores)[:k]
+            results.append([(int(rows[i]), float(scores[i])) for i in order])
+        return results
+
+
+class _Column:
+    """One field of every row (deleted ones included), by row index across segments, read on access."""
+
+    def __init__(self, store, read):
+        self._store = store
+        self._read = read
+
+    def __len__(self):
+        return int(self._store._starts[-1])
+
+    def __getitem__(self, row: int):
+        starts = self._store._starts
+        if not 0 <= row < starts[-1]:
+            raise IndexError(row)
+        s = bisect_right(starts, row) - 1
+        return self._read(self._store.segments[s], int(row - starts[s]))
+
+    def __iter__(self):
+        for segment in self._store.segments:
+            for i in range(segment.size):
+                yield self._read(segment, i)
+
+
+class QuantizedVectorStore(VectorStore):
+    """
+    `dtype` is "int8" (4x smaller than float32) or "float16" (2x). With
+    `rescore`, a float32 copy is kept and the top `rescore_factor * k`
+    quantized hits are re-ranked exactly. `n_lists` > 0 builds an IVF
+    index when a segment is written; queries then scan `nprobe` clusters.
+    Rows are widened to float32 block by block while scoring, so an
+    exhaustive scan costs a conversion per row (slow for float16 in NumPy);
+    batched queries and IVF amortize or avoid it.
+
+    Wrap many writes in bulk() to write one compacted segment at the end.
+    Other processes see a write after they reopen the store; the files of
+    the version before it are kept until the next write.
+    """
+
+    def __init__(self, directory, embedding=None, dtype: str = "int8", rescore: bool = True,
+                 rescore_factor: int = 4, n_lists: int = 0, nprobe: int = 8):
+        if dtype not in DTYPES:
+            raise ValueError(f"dtype must be one of {sorted(DTYPES)}")
+        self.directory = Path(directory)
+        self.embedding = embedding
+        self.dtype = dtype
+        self.rescore = rescore
+        self.rescore_factor = rescore_factor
+        self.n_lists = n_lists
+        self.nprobe = nprobe
+        self._lock = threading.RLock()
+        self._bulk = 0
+        self._dirty = False
+        self._pending = None
+        self.ids = _Column(self, lambda segment, i: segment.ids[i])
+        self.documents = _Column(self, lambda segment, i: segment.documents[i])
+        self.metadatas = _Column(self, lambda segment, i: segment.metadata(i))
+        self._load()
+
+    @property
+    def embeddings(self):
+        return self.embedding
+
+    # ---- Storage ---- #
+    @staticmethod
+    def exists(directory) -> bool:
+        return (Path(directory) / MANIFEST_NAME).exists()
+
+    def _load(self):
+        manifest = {"segments": [], "deleted": None}
+        manifest_path = self.directory / MANIFEST_NAME
+        if manifest_path.exists():
+            with open(manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+            self.dtype = manifest["dtype"]
+        self._manifest = manifest
+        self.segments = [_Segment(self.directory / name) for name in manifest["segments"]]
+        self._starts = np.cumsum([0] + [segment.size for segment in self.segments]).astype(np.int64)
+        self.deleted = np.load(self.directory / manifest["deleted"], mmap_mode="r") if manifest["deleted"] else None
+        self._live = int(self._starts[-1]) - (int(np.count_nonzero(self.deleted)) if self.deleted is not None else 0)
+
+    def _new_segment(self, ids, documents, metadatas, unit_rows):
+        path = self.directory / f"segment-{uuid.uuid4().hex}"
+        return _Segment.write(path, ids, documents, metadatas, unit_rows, self.dtype, self.rescore, self.n_lists)
+
+    def _publish(self, segments, deleted=None):
+        """
+        Replaces the manifest with one naming `segments` and the `deleted`
+        row mask, then removes files that neither it nor the previous
+        manifest uses, and reopens the store.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        manifest = {"dtype": self.dtype, "segments": [segment.path.name for segment in segments], "deleted": None}
+        if deleted is not None and deleted.any():
+            manifest["deleted"] = f"deleted-{uuid.uuid4().hex}.npy"
+            np.save(self.directory / manifest["deleted"], deleted)
+        tmp = self.directory / "manifest.tmp.json"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp, self.directory / MANIFEST_NAME)
+
+        keep = {*manifest["segments"], *self._manifest["segments"], manifest["deleted"], self._manifest["deleted"]}
+        for path in self.directory.iterdir():
+            if path.name.startswith(("segment-", "deleted-")) and path.name not in keep:
+                shutil.rmtree(path) if path.is_dir() else path.unlink()
+        self._load()
+
+    def _write(self, ids, documents, metadatas, unit_rows):
+        """Writes the rows as one new segment and makes it the whole store."""
+        self._publish([self._new_segment(ids, documents, metadatas, unit_rows)] if len(ids) else [])
+
+    def _live_rows(self) -> np.ndarray:
+        if self.deleted is None:
+            return np.arange(self._starts[-1])
+        return np.flatnonzero(~np.asarray(self.deleted))
+
+    def _locate(self, doc_id: str):
+        """Row of the live copy of `doc_id`, or None."""
+        for s, segment in enumerate(self.segments):
+            i = segment.find(doc_id)
+            if i >= 0:
+                row = int(self._starts[s]) + i
+                if self.deleted is None or not self.deleted[row]:
+                    return row
+        return None
+
+    def _deleted_mask(self, extra_rows: int = 0) -> np.ndarray:
+        """A writable copy of the deleted-row mask, with room for `extra_rows` appended rows."""
+        mask = np.zeros(int(self._starts[-1]) + extra_rows, dtype=bool)
+        if self.deleted is not None:
+            mask[:len(self.deleted)] = self.deleted
+        return mask
+
+    def _rows(self, indices=None) -> np.ndarray:
+        """float32 unit rows by store row index (all live rows by default)."""
+        indices = self._live_rows() if indices is None else np.asarray(indices, dtype=np.int64)
+        if not len(indices):
+            return np.zeros((0, 0), dtype=np.float32)
+        which = np.searchsorted(self._starts, indices, side="right") - 1
+        out = None
+        for s in np.unique(which):
+            mask = which == s
+            rows = self.segments[s].rows(indices[mask] - self._starts[s])
+            if out is None:
+                out = np.empty((len(indices), rows.shape[1]), dtype=np.float32)
+            out[mask] = rows
+        return out
+
+    @contextmanager
+    def bulk(self):
+        """Defers writes until the outermost bulk() block exits, then writes the store as one segment."""
+        with self._lock:
+            if self._bulk == 0:
+                live = self._live_rows()
+                self._pending = {
+                    "ids": [self.ids[i] for i in live],
+                    "documents": [self.documents[i] for i in live],
+                    "metadatas": [self.metadatas[i] for i in live],
+                    "rows": list(self._rows(live)) if len(live) else [],
+                }
+            self._bulk += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._bulk -= 1
+                if self._bulk == 0 and self._dirty:
+                    pending = self._pending
+                    rows = np.stack(pending["rows"]) if pending["rows"] else np.zeros((0, 0), dtype=np.float32)
+                    self._write(pending["ids"], pending["documents"], pending["metadatas"], rows)
+                    self._dirty = False
+                self._pending = None if self._bulk == 0 else self._pending
+
+    # ---- Chroma collection API subset ---- #
+    def count(self) -> int:
+        return self._live
+
+    def upsert(self, ids, embeddings, documents=None, metadatas=None):
+        """Outside bulk(), writes the rows as a new segment and marks the rows they replace deleted."""
+        if not len(ids):
+            return
+        unit_rows = _unit(embeddings)
+        with self._lock:
+            if self._bulk == 0 and len(self.segments) < MAX_SEGMENTS:
+                latest = {doc_id: j for j, doc_id in enumerate(ids)}  # the last copy of a repeated id wins
+                picks = list(latest.values())
+                deleted = self._deleted_mask(len(picks))
+                for doc_id in latest:
+                    row = self._locate(doc_id)
+                    if row is not None:
+                        deleted[row] = True
+                segment = self._new_segment(
+                    list(latest),
+                    [documents[j] if documents is not None else "" for j in picks],
+                    [metadatas[j] if metadatas is not None else None for j in picks],
+                    unit_rows[picks],
+                )
+                self._publish(self.segments + [segment], deleted)
+                return
+            with self.bulk():
+                pending = self._pending
+                position = {doc_id: i for i, doc_id in enumerate(pending["ids"])}
+                for j, doc_id in enumerate(ids):
+                    document = documents[j] if documents is not None else ""
+                    metadata = metadatas[j] if metadatas is not None else None
+                    i = position.get(doc_id)
+                    if i is None:
+                        position[doc_id] = len(pending["ids"])
+                        pending["ids"].append(doc_id)
+                        pending["documents"].append(document)
+                        pending["metadatas"].append(metadata)
+                        pending["rows"].append(unit_rows[j])
+                    else:
+                        pending["documents"][i], pending["metadatas"][i], pending["rows"][i] = document, metadata, unit_rows[j]
+                self._dirty = True
+
+    def delete(self, ids=None, **kwargs):
+        """Outside bulk(), only rewrites the deleted-row mask."""
+        if not ids:
+            return
+        with self._lock:
+            if self._bulk == 0:
+                rows = [row for row in map(self._locate, ids) if row is not None]
+                if rows:
+                    deleted = self._deleted_mask()
+                    deleted[rows] = True
+                    if deleted.all():
+                        self._publish([])
+                    else:
+                        self._publish(self.segments, deleted)
+                return
+            with self.bulk():
+                pending = self._pending
+                drop = set(ids)
+                keep = [i for i, doc_id in enumerate(pending["ids"]) if doc_id not in drop]
+                if len(keep) != len(pending["ids"]):
+                    for key in ("ids", "documents", "metadatas", "rows"):
+                        pending[key] = [pending[key][i] for i in keep]
+                    self._dirty = True
+
+    def get(self, ids=None, include=("documents", "metadatas"), limit=None, offset=0, **kwargs):
+        if ids is not None:
+            indices = [row for row in map(self._locate, ids) if row is not None]
+        else:
+            indices = self._live_rows()[offset:None if limit is None else offset + limit].tolist()
+        result = {"ids": [self.ids[i] for i in indices]}
+        if "documents" in include:
+            result["documents"] = [self.documents[i] for i in indices]
+        if "metadatas" in include:
+            result["metadatas"] = [self.metadatas[i] for i in indices]
+        if "embeddings" in include:
+            result["embeddings"] = self._rows(indices)
+        return result
+
+    def query(self, query_embeddings, n_results: int = 4, include=("documents", "metadatas", "distances"), **kwargs):
+        hits = self.search(query_embeddings, n_results)
+        result = {"ids": [[self.ids[i] for i, _ in row] for row in hits]}
+        if "documents" in include:
+            result["documents"] = [[self.documents[i] for i, _ in row] for row in hits]
+        if "metadatas" in include:
+            result["metadatas"] = [[self.metadatas[i] for i, _ in row] for row in hits]
+        if "distances" in include:
+            result["distances"] = [[1.0 - score for _, score in row] for row in hits]
+        if "embeddings" in include:
+            result["embeddings"] = [self._rows([i for i, _ in row]) for row in hits]
+        return result
+
+    # ---- Search ---- #
+    def search(self, query_embeddings, k: int = 4):
+        """Top-k (row index, cosine score) pairs per query, best first; queries are searched as one batch."""
+        if not self._live:
+            return [[] for _ in np.atleast_2d(query_embeddings)]
+        queries = _unit(query_embeddings)
+        results = [[] for _ in queries]
+        for s, segment in enumerate(self.segments):
+            start, end = int(self._starts[s]), int(self._starts[s + 1])
+            deleted = np.asarray(self.deleted[start:end]) if self.deleted is not None else None
+            if deleted is not None and deleted.all():
+                continue
+            for q, hits in enumerate(segment.search(queries, k, self.rescore_factor, self.nprobe, deleted)):
+                results[q].extend((start + row, score) for row, score in hits)
+        return [sorted(hits, key=lambda hit: -hit[1])[:k] for hits in results]
+
+    # ---- LangChain VectorStore API ---- #
+    def add_texts(self, texts, metadatas=None, ids=None, **kwargs):
+        texts = list(texts)
+        ids = list(ids) if ids is not None else [uuid.uuid4().hex for _ in texts]
+        vectors = self.embedding.embed_documents(texts)
+        self.upsert(ids=ids, embeddings=vectors, documents=texts, metadatas=list(metadatas) if metadatas else None)
+        return ids
+
+    def similarity_search_by_vector_with_score(self, embedding, k: int = 4):
+        return [
+            (Document(page_content=self.documents[i], metadata=self.metadatas[i] or {}), score)
+            for i, score in self.search([embedding], k)[0]
+        ]
+
+    def similarity_search_by_vector(self, embedding, k: int = 4, **kwargs):
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs):
+        return self.similarity_search_by_vector_with_score(self.embedding.embed_query(query), k)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    def _select_relevance_score_fn(self):
+        return lambda score: score
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, ids=None, directory=None, **kwargs):
+        store = cls(directory, embedding, **kwargs)
+        with store.bulk():
+            store.delete(list(store.ids))
+            store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
+
+    @classmethod
+    def from_collection(cls, collection, directory, embedding=None, page_size: int = 5000, **kwargs):
+        """Copies every vector out of a Chroma collection (or another store) into a new store."""
+        store = cls(directory, embedding, **kwargs)
+        offset = 0
+        with store.bulk():
+            while True:
+                page = collection.get(include=["documents", "metadatas", "embeddings"], limit=page_size, offset=offset)
+                if not page["ids"]:
+                    break
+                store.upsert(page["ids"], page["embeddings"], page["documents"], page["metadatas"])
+                offset += len(page["ids"])
+        return store
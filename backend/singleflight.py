@@ -0,0 +1,114 @@
+"""
+Request coalescing ("single flight").
+
+While a call for a key is in flight, further callers with the same key
+attach to it instead of starting their own. `do()` shares the result of a
+coroutine; `stream()` shares the items of an async iterator, replaying
+what was already produced to late joiners and then following along live.
+The work runs in its own task, so a caller that goes away does not cancel
+it for the others. Errors and timeouts reach every caller of the flight,
+and the key is released as soon as the flight ends.
+"""
+import asyncio
+
+
+class _Flight:
+    def __init__(self):
+        self.items = []
+        self.done = False
+        self.error = None
+        self.changed = asyncio.Event()
+        self.task = None
+
+    def publish(self, item):
+        self.items.append(item)
+        self._wake()
+
+    def finish(self, error=None):
+        self.done = True
+        self.error = error
+        self._wake()
+
+    def _wake(self):
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls per key. `timeout` (seconds, None for no
+    limit) bounds a whole flight; when it expires the work is cancelled and
+    every caller gets asyncio.TimeoutError.
+    """
+
+    def __init__(self, timeout: float = None):
+        self.timeout = timeout
+        self._flights = {}
+        self.calls = 0
+        self.shared = 0
+        self.errors = 0
+        self.timeouts = 0
+
+    async def _pump(self, key, flight, factory):
+        async def produce():
+            async for item in factory():
+                flight.publish(item)
+
+        try:
+            await asyncio.wait_for(produce(), self.timeout)
+        except asyncio.TimeoutError as e:
+            self.timeouts += 1
+            flight.finish(e)
+        except asyncio.CancelledError as e:
+            flight.finish(e)
+            raise
+        except Exception as e:
+            self.errors += 1
+            flight.finish(e)
+        else:
+            flight.finish()
+        finally:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+    def _join(self, key, factory):
+        flight = self._flights.get(key)
+        if flight is not None:
+            self.shared += 1
+            return flight
+        flight = self._flights[key] = _Flight()
+        self.calls += 1
+        flight.task = asyncio.create_task(self._pump(key, flight, factory))
+        return flight
+
+    async def stream(self, key, factory):
+        """Yields the items of factory() (an async iterator), shared with concurrent callers of `key`."""
+        flight = self._join(key, factory)
+        index = 0
+        while True:
+            if index < len(flight.items):
+                yield flight.items[index]
+                index += 1
+            elif flight.done:
+                if flight.error is not None:
+                    raise flight.error
+                return
+            else:
+                await flight.changed.wait()
+
+    async def do(self, key, factory):
+        """Returns the result of `await factory()`, shared with concurrent callers of `key`."""
+        async def single():
+            yield await factory()
+
+        results = [result async for result in self.stream(key, single)]
+        return results[0]
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._flights),
+            "calls": self.calls,
+            "shared": self.shared,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+        }
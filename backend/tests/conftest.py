@@ -0,0 +1,24 @@
+"""
+Test setup: the app runs in-process against a temporary SQLite database
+and vector store, with the offline fakes from benchmarks/fakes.py in place
+of Gemini, the embedding model and Google Translate.
+"""
+from pathlib import Path
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+WORKDIR = Path(tempfile.mkdtemp(prefix="justice-tests-"))
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{WORKDIR / 'test.db'}")
+os.environ.setdefault("RAG_WARMUP", "0")
+os.environ.setdefault("RAG_PRELOAD", "0")
+os.environ.setdefault("TRANSLATION_BACKEND", "local")
+sys.path[:0] = [str(BACKEND_DIR), str(BACKEND_DIR / "benchmarks")]
+
+
+@pytest.fixture(scope="session")
+def workdir():
+    return WORKDIR
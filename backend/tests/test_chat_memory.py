@@ -0,0 +1,81 @@
+import asyncio
+
+import httpx
+
+from fakes import FakeChatModel, install_fakes
+
+import main
+import RAG
+from build_faq import build_store
+from translation import LocalBackend, TranslationService
+
+
+def faq_hits():
+    return sum(RAG.FAQ_ROUTES._values.get((outcome,), 0) for outcome in ("exact", "semantic"))
+
+
+async def ask_after_new_chat(workdir, question):
+    """Opens a chat the way the web client does, then asks `question` in it."""
+    llm = FakeChatModel(latency=0.01, tokens_per_second=5000)
+    install_fakes(RAG.rag_engine, workdir / "chroma", llm=llm)
+    store = await build_store(TranslationService(LocalBackend()), ["hi"])
+    store.save(RAG.rag_engine.faq_dir)
+    RAG.rag_engine._faq_checked = False
+
+    async with main.app.router.lifespan_context(main.app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as client:
+            credentials = {"username": "memory-user", "password": "memory-password"}
+            await client.post("/register", json=credentials)
+            token = (await client.post("/token", data=credentials)).json()["access_token"]
+            headers = {"Authorization": f"Bearer {token}"}
+            opened = await client.post("/chat", json={"user_message": main.NEW_CHAT_WELCOME, "session_id": None}, headers=headers)
+            session_id = opened.json()["session_id"]
+
+            async with main.AsyncSessionLocal() as db:
+                user_id = (await db.execute(main.select(main.User.id).where(main.User.username == credentials["username"]))).scalar_one()
+            memory = await main.load_memory(user_id, session_id, question)
+
+            calls, hits = llm.calls, faq_hits()
+            answered = await client.post("/chat", json={"user_message": question, "session_id": session_id}, headers=headers)
+            return answered, memory, llm.calls - calls, faq_hits() - hits
+
+
+def test_first_question_after_new_chat_is_served_from_faq(workdir):
+    answered, memory, llm_calls, hits = asyncio.run(ask_after_new_chat(workdir, "How do I file an FIR?"))
+    assert answered.status_code == 200
+    assert memory == ("", None, False)
+    assert hits == 1
+    assert llm_calls == 0
+
+
+def test_opening_turns():
+    assert main.is_opening_turn(main.NEW_CHAT_WELCOME)
+    assert main.is_opening_turn("Hello!")
+    assert not main.is_opening_turn("How do I file an FIR?")
+
+
+def test_deleting_a_session_deletes_its_summary(workdir):
+    async def run():
+        install_fakes(RAG.rag_engine, workdir / "chroma", llm=FakeChatModel(latency=0.01, tokens_per_second=5000))
+        async with main.app.router.lifespan_context(main.app):
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as client:
+                credentials = {"username": "summary-user", "password": "summary-password"}
+                await client.post("/register", json=credentials)
+                token = (await client.post("/token", data=credentials)).json()["access_token"]
+                headers = {"Authorization": f"Bearer {token}"}
+                answered = await client.post("/chat", json={"user_message": "What is bail?", "session_id": None}, headers=headers)
+                session_id = answered.json()["session_id"]
+
+                async with main.AsyncSessionLocal() as db:
+                    user_id = (await db.execute(main.select(main.User.id).where(main.User.username == credentials["username"]))).scalar_one()
+                    db.add(main.ChatSummary(user_id=user_id, session_id=session_id, summary="Asked about bail.", summarized_until=1))
+                    await db.commit()
+                deleted = await client.delete(f"/sessions/{session_id}", headers=headers)
+
+                async with main.AsyncSessionLocal() as db:
+                    summary = await db.get(main.ChatSummary, (user_id, session_id))
+                return deleted.status_code, summary
+
+    status, summary = asyncio.run(run())
+    assert status == 200
+    assert summary is None
@@ -0,0 +1,58 @@
+"""Requests that arrive while the engine is still loading must not stall the event loop."""
+import asyncio
+import threading
+import time
+
+from fakes import install_fakes
+
+import RAG
+
+
+def hold_engine_lock(seconds):
+    """Holds the engine lock on another thread, as warm-up does while it loads a model."""
+    taken = threading.Event()
+
+    def hold():
+        with RAG.rag_engine._lock:
+            taken.set()
+            time.sleep(seconds)
+
+    threading.Thread(target=hold, daemon=True).start()
+    taken.wait()
+
+
+def run_while_locked(coro_fn):
+    """Runs coro_fn() while the engine lock is held; returns its result and the longest event loop stall."""
+    async def run():
+        lags = []
+
+        async def tick():
+            while True:
+                start = time.perf_counter()
+                await asyncio.sleep(0.01)
+                lags.append(time.perf_counter() - start - 0.01)
+
+        ticker = asyncio.create_task(tick())
+        await asyncio.sleep(0.05)
+        hold_engine_lock(0.5)
+        result = await coro_fn()
+        await asyncio.sleep(0.05)
+        ticker.cancel()
+        return result, max(lags)
+
+    return asyncio.run(run())
+
+
+def test_routing_during_warm_up_does_not_block_the_loop(tmp_path):
+    install_fakes(RAG.rag_engine, tmp_path / "chroma")
+    answers, max_lag = run_while_locked(lambda: RAG.afaq_answers("What is bail?"))
+    assert answers is None
+    assert max_lag < 0.2
+
+
+def test_retrieval_after_failed_warm_up_does_not_block_the_loop(tmp_path):
+    install_fakes(RAG.rag_engine, tmp_path / "chroma")
+    RAG.rag_engine.warmup_failed_at = time.monotonic()
+    snippets, max_lag = run_while_locked(lambda: RAG.aretrieval("How do I file an FIR with the police?"))
+    assert snippets
+    assert max_lag < 0.2
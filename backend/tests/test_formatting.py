@@ -0,0 +1,81 @@
+import random
+
+import pytest
+from fakes import FAKE_ANSWER
+from format_bench import legacy_format_response
+
+from formatting import ResponseFormatter, format_response
+
+GOLDEN = [
+    # (input, expected, legacy-equal)
+    pytest.param("Legal aid is free. You can apply online. Bring your ID.",
+                 "Legal aid is free.\nYou can apply online.\nBring your ID.", True, id="plain sentences"),
+    pytest.param("**Important:** keep a copy of the complaint. **Do not** sign blank papers.",
+                 "<strong>Important:</strong> keep a copy of the complaint.\n<strong>Do not</strong> sign blank papers.",
+                 True, id="bold"),
+    pytest.param("Your rights: • Right to a lawyer •Right to remain silent\n\n• Right to bail",
+                 "Your rights:\n• Right to a lawyer\n• Right to remain silent\n• Right to bail", True, id="bullets"),
+    pytest.param("First line.\n\n\n   \nSecond line   \nThird line",
+                 "First line.\nSecond line\nThird line", True, id="blank lines"),
+    pytest.param("This is **not closed\nand this** is not bold.",
+                 "This is **not closed\nand this** is not bold.", True, id="unclosed bold"),
+    pytest.param("Steps: 1. Visit the station. 2. Describe the incident. 3. Collect the receipt.",
+                 "Steps:\n1. Visit the station.\n2. Describe the incident.\n3. Collect the receipt.", False,
+                 id="inline steps"),
+    pytest.param("I. Filing a Complaint\n• Visit the station.\nII. Next Steps\n1. Wait for the FIR.",
+                 "I. Filing a Complaint\n• Visit the station.\nII. Next Steps\n1. Wait for the FIR.", False,
+                 id="headings"),
+    pytest.param("Under Section 154.2 the fee is Rs. 5.50 per page.",
+                 "Under Section 154.2 the fee is Rs. 5.50 per page.", False, id="decimals"),
+    pytest.param("Article 21. Everyone has the right to life. Read Section 12 and Rule 4.",
+                 "Article 21.\nEveryone has the right to life.\nRead Section 12 and Rule 4.", False, id="references"),
+    pytest.param("See No. 4. Then apply, e.g. online. Mr. Rao signed.",
+                 "See No. 4.\nThen apply, e.g. online.\nMr. Rao signed.", False, id="abbreviations"),
+    pytest.param("The RTI Act was passed in 2005. It applies to all public authorities.",
+                 "The RTI Act was passed in 2005.\nIt applies to all public authorities.", False, id="years"),
+    pytest.param(FAKE_ANSWER,
+                 "I. <strong>Filing a Complaint</strong>\n• Visit the nearest police station.\n"
+                 "• Describe the incident clearly.\n• Ask for an acknowledgment.\nII. Steps to Follow\n"
+                 "1. Write down the facts.\n2. Submit the written complaint.\n3. Collect a copy of the FIR.\n"
+                 "III. KEY POINTS TO REMEMBER:\n• The police must register your complaint.\n"
+                 "• You can approach the Superintendent of Police if refused.\nIV. ADDITIONAL RESOURCES:\n"
+                 "- Contact the District Legal Services Authority for free legal aid.", False, id="fake answer"),
+]
+# Fragments for random answers, chosen to put tokens next to each other.
+FRAGMENTS = [
+    "Visit the station", "Section 12", "No. 4", "Rs. 5.50", "2005", "II", "XIV", "e.g.", "**bold**", "**",
+    "•", "1.", "12.", "154.2", ".", ". ", " ", "  ", "\n", "\n\n", " \n", "\t", "I", "Art", "word.",
+]
+
+
+def chunks(text: str, rng: random.Random, max_size: int = 8):
+    i = 0
+    while i < len(text):
+        size = rng.randint(1, max_size)
+        yield text[i:i + size]
+        i += size
+
+
+def stream(text: str, rng: random.Random) -> str:
+    formatter = ResponseFormatter()
+    return "".join(formatter.feed(piece) for piece in chunks(text, rng)) + formatter.flush()
+
+
+@pytest.mark.parametrize("text, expected, legacy_equal", GOLDEN)
+def test_golden_output(text, expected, legacy_equal):
+    assert format_response(text) == expected
+    if legacy_equal:
+        assert "\n".join(line.rstrip() for line in legacy_format_response(text).split("\n")) == expected
+
+
+@pytest.mark.parametrize("text, expected, legacy_equal", GOLDEN)
+def test_streamed_golden_output(text, expected, legacy_equal):
+    for seed in range(50):
+        assert stream(text, random.Random(seed)) == expected
+
+
+def test_streaming_matches_whole_answer():
+    rng = random.Random(0)
+    for _ in range(2000):
+        text = "".join(rng.choice(FRAGMENTS) + rng.choice(["", " "]) for _ in range(rng.randint(1, 30)))
+        assert stream(text, rng) == format_response(text), repr(text)
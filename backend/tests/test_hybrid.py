@@ -0,0 +1,48 @@
+import asyncio
+import json
+
+import numpy as np
+from fakes import install_fakes
+
+import RAG
+from hybrid import LexicalIndex
+
+
+def test_lexical_index_keeps_ids_and_reads_texts_from_the_store(tmp_path):
+    engine = RAG.RAGEngine(str(tmp_path))
+    install_fakes(engine, tmp_path)
+    index = engine.rebuild_lexical_index()
+
+    meta = json.loads((engine.lexical_index_dir / "meta.json").read_text())
+    assert set(meta) == {"terms", "doc_ids"}
+    assert not hasattr(index, "texts")
+
+    hits = engine.lexical_search("FIR police station", 3)
+    assert hits and all(text in RAG.SEED_DOCUMENTS for text in hits)
+    assert hits == [engine.collection.get(ids=[doc_id])["documents"][0] for doc_id in index.search_ids("FIR police station", 3)]
+
+
+def test_keyword_queries_are_answered_from_the_index(workdir):
+    install_fakes(RAG.rag_engine, workdir / "chroma")
+    snippets = asyncio.run(RAG.aretrieval("RTI"))
+    assert snippets and all("RTI" in snippet or "Right to Information" in snippet for snippet in snippets)
+
+
+def test_updated_index_matches_a_rebuild():
+    texts = {f"doc-{i}": text for i, text in enumerate(RAG.SEED_DOCUMENTS)}
+    index = LexicalIndex.build(list(texts), list(texts.values()))
+
+    removed = ["doc-0", "doc-5"]
+    changed = {"doc-3": "Bail may be granted by the magistrate.", "doc-new": "Zebra crossings and traffic fines."}
+    updated = index.updated(removed, list(changed), list(changed.values()))
+
+    for doc_id in removed + list(changed):
+        texts.pop(doc_id, None)
+    texts.update(changed)
+    rebuilt = LexicalIndex.build(list(texts), list(texts.values()))
+
+    assert updated.doc_ids == rebuilt.doc_ids
+    assert updated.term_ids == rebuilt.term_ids
+    for name in ("offsets", "docs", "tfs", "doc_len"):
+        assert np.array_equal(getattr(updated, name), getattr(rebuilt, name)), name
+    assert updated.search_ids("magistrate bail", 3)[0] == "doc-3"
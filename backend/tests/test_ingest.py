@@ -0,0 +1,27 @@
+import numpy as np
+from fakes import install_fakes
+
+import ingest
+import RAG
+
+
+class FakeEngine(RAG.RAGEngine):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        install_fakes(self, self.persist_dir)
+
+
+def test_repeated_text_is_ingested_once_into_an_empty_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest, "RAGEngine", FakeEngine)
+    source = tmp_path / "corpus" / "act.txt"
+    source.parent.mkdir()
+    source.write_text(" ".join(["Every person has the right to free legal aid."] * 40) + " The end.")
+    ingestor = ingest.Ingestor(str(tmp_path / "store"), chunk_size=100, overlap=20)
+
+    batches = list(ingestor._iter_batches([source]))
+    for batch in batches:
+        ingestor._upsert(batch, np.asarray(ingestor.engine.embeddings.embed_documents([text for _, text, _ in batch])))
+
+    ids = [chunk_id for batch in batches for chunk_id, _, _ in batch]
+    assert len(ids) == len(set(ids)) < len(list(ingest.iter_chunks(source, 100, 20)))
+    assert sorted(ingestor.collection.get()["ids"]) == sorted(ids)
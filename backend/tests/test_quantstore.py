@@ -0,0 +1,59 @@
+import json
+
+import numpy as np
+
+import quantstore
+from quantstore import QuantizedVectorStore
+
+
+def vectors(n, seed=0):
+    return np.random.default_rng(seed).standard_normal((n, 16)).astype(np.float32)
+
+
+def segment_dirs(directory):
+    return sorted(path.name for path in directory.iterdir() if path.name.startswith("segment-"))
+
+
+def test_upsert_outside_bulk_appends_a_segment(tmp_path):
+    store = QuantizedVectorStore(tmp_path, n_lists=4)
+    base = vectors(40)
+    store.upsert([f"d{i}" for i in range(40)], base, [f"text {i}" for i in range(40)], [{"i": i} for i in range(40)])
+    first = segment_dirs(tmp_path)
+    codes = (tmp_path / first[0] / "codes.npy").stat().st_mtime_ns
+
+    replacement = vectors(1, seed=1)
+    store.upsert(["d3", "new"], np.vstack([replacement, vectors(1, seed=2)]), ["changed", "added"], [{"i": 3}, None])
+    assert set(first) < set(segment_dirs(tmp_path))
+    assert (tmp_path / first[0] / "codes.npy").stat().st_mtime_ns == codes
+    assert store.count() == 41
+
+    reopened = QuantizedVectorStore(tmp_path)
+    assert reopened.get(ids=["d3", "new", "missing"])["documents"] == ["changed", "added"]
+    hits = reopened.query(base[3:4], n_results=41)
+    assert hits["ids"][0].count("d3") == 1
+    assert reopened.query(replacement, n_results=1)["documents"] == [["changed"]]
+
+
+def test_manifest_holds_no_rows_and_old_versions_are_removed(tmp_path):
+    store = QuantizedVectorStore(tmp_path)
+    for round_ in range(3):
+        store.upsert([f"r{round_}"], vectors(1, seed=round_), [f"document {round_}"])
+    store.delete(["r1"])
+    manifest = json.loads((tmp_path / quantstore.MANIFEST_NAME).read_text())
+    assert set(manifest) == {"dtype", "segments", "deleted"}
+    assert set(segment_dirs(tmp_path)) == set(manifest["segments"])
+    assert [page for page in store.get()["documents"]] == ["document 0", "document 2"]
+
+
+def test_writes_compact_into_one_segment(tmp_path, monkeypatch):
+    monkeypatch.setattr(quantstore, "MAX_SEGMENTS", 3)
+    store = QuantizedVectorStore(tmp_path)
+    for i in range(4):
+        store.upsert([f"d{i}"], vectors(1, seed=i), [f"text {i}"])
+    assert len(store.segments) == 1 and store.count() == 4
+
+    with store.bulk():
+        store.upsert(["d0"], vectors(1, seed=9), ["rewritten"])
+        store.delete(["d1"])
+    assert len(store.segments) == 1
+    assert sorted(store.get()["documents"]) == ["rewritten", "text 2", "text 3"]
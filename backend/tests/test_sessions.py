@@ -0,0 +1,62 @@
+from contextlib import asynccontextmanager
+import asyncio
+
+import httpx
+
+from fakes import FakeChatModel, install_fakes
+
+import main
+import RAG
+
+
+@asynccontextmanager
+async def signed_in(workdir, username):
+    install_fakes(RAG.rag_engine, workdir / "chroma", llm=FakeChatModel(latency=0.01, tokens_per_second=5000))
+    async with main.app.router.lifespan_context(main.app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as client:
+            credentials = {"username": username, "password": "sessions-password"}
+            await client.post("/register", json=credentials)
+            token = (await client.post("/token", data=credentials)).json()["access_token"]
+            client.headers["Authorization"] = f"Bearer {token}"
+            yield client
+
+
+def test_sessions_etag_follows_writes(workdir):
+    async def run():
+        async with signed_in(workdir, "etag-user") as client:
+            async def revalidate(etag):
+                response = await client.get("/sessions", headers={"If-None-Match": etag})
+                return response.status_code, response.headers["ETag"]
+
+            first = (await client.get("/sessions")).headers["ETag"]
+            assert await revalidate(first) == (304, first)
+
+            session_id = (await client.post("/chat", json={"user_message": "What is bail?", "session_id": None})).json()["session_id"]
+            status, second = await revalidate(first)
+            assert status == 200 and second != first
+            assert await revalidate(second) == (304, second)
+
+            await client.delete(f"/sessions/{session_id}")
+            status, third = await revalidate(second)
+            assert status == 200 and third not in (first, second)
+
+            missing = await client.delete("/sessions/no-such-session")
+            assert missing.status_code == 404
+            assert await revalidate(third) == (304, third)
+
+    asyncio.run(run())
+
+
+def test_concurrent_backfills_do_not_fail(workdir):
+    async def run():
+        async with signed_in(workdir, "backfill-user") as client:
+            await client.post("/chat", json={"user_message": "What is an FIR?", "session_id": None})
+            async with main.engine.begin() as conn:
+                expected = (await conn.execute(main.text("SELECT COUNT(*) FROM chat_session"))).scalar()
+                await conn.execute(main.text("DELETE FROM chat_session"))
+            await asyncio.gather(*(main.backfill_chat_sessions() for _ in range(4)))
+            async with main.engine.connect() as conn:
+                return expected, (await conn.execute(main.text("SELECT COUNT(*) FROM chat_session"))).scalar()
+
+    expected, restored = asyncio.run(run())
+    assert restored == expected > 0
@@ -0,0 +1,29 @@
+import asyncio
+
+from fakes import FAKE_ANSWER
+
+from formatting import format_response
+from translation import LocalBackend, TranslationService, pack_lines
+
+
+def test_formatted_answer_is_one_request():
+    answer = format_response(FAKE_ANSWER)
+    backend = LocalBackend()
+    translated = asyncio.run(TranslationService(backend).translate(answer, "hi"))
+    assert backend.calls == 1
+    assert translated == f"[hi] {answer}"
+
+
+def test_long_answers_are_packed_up_to_the_limit():
+    lines = [f"• Point number {i} of the answer." for i in range(100)]
+    chunks = list(pack_lines("\n".join(lines), max_chars=300))
+    assert 1 < len(chunks) < len(lines)
+    assert all(len(chunk) <= 300 for chunk in chunks)
+    assert "\n".join(chunks) == "\n".join(lines)
+
+
+def test_overlong_line_is_split_at_sentence_ends():
+    line = " ".join(f"Sentence {i} is here." for i in range(50))
+    chunks = list(pack_lines(f"Heading\n{line}\nFooter", max_chars=100))
+    assert chunks[0] == "Heading" and chunks[-1] == "Footer"
+    assert all(len(chunk) <= 100 for chunk in chunks)
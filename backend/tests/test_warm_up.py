@@ -0,0 +1,30 @@
+import asyncio
+
+import RAG
+
+
+class FailingEngine(RAG.RAGEngine):
+    def __init__(self):
+        super().__init__()
+        self.attempts = 0
+
+    def preload(self):
+        self.attempts += 1
+        raise RuntimeError("model download failed")
+
+
+def test_failed_warm_up_is_not_rerun_by_every_request():
+    engine = FailingEngine()
+    engine.warm_up()
+
+    async def requests():
+        for _ in range(5):
+            await engine.ensure_ready()
+
+    asyncio.run(requests())
+    assert engine.attempts == 1
+    assert engine.warmup_error == "model download failed"
+
+    engine.warmup_failed_at -= RAG.RAG_WARMUP_RETRY
+    asyncio.run(engine.ensure_ready())
+    assert engine.attempts == 2
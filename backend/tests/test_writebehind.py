@@ -0,0 +1,46 @@
+import asyncio
+
+import pytest
+
+from writebehind import WriteBehindQueue
+
+
+class FakeSession:
+    """Commits its rows into `committed` unless one of them is "bad"."""
+
+    def __init__(self, committed):
+        self.committed = committed
+        self.rows = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def commit(self):
+        if "bad" in self.rows:
+            raise ValueError("constraint failed")
+        self.committed.extend(self.rows)
+
+
+async def add_rows(session, rows):
+    session.rows.extend(rows)
+
+
+def test_failed_batch_only_fails_the_bad_row():
+    committed = []
+
+    async def run():
+        queue = WriteBehindQueue(lambda: FakeSession(committed), add_rows, flush_interval=0.05)
+        queue.start()
+        futures = [await queue.submit(row) for row in ("a", "bad", "b")]
+        results = await asyncio.gather(*futures, return_exceptions=True)
+        await queue.stop()
+        return results
+
+    results = asyncio.run(run())
+    assert results[0] is None and results[2] is None
+    with pytest.raises(ValueError):
+        raise results[1]
+    assert committed == ["a", "b"]
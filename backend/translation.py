@@ -0,0 +1,141 @@
+"""
+Asynchronous translation of chat answers.
+
+Answers are packed line by line into chunks of up to max_chunk_chars, so
+most answers are translated in one request; longer ones are split into a
+few chunks that are translated concurrently (up to a limit) and
+reassembled in order. Translations are cached per (chunk hash, target
+language), so repeated answers cost no network round trip, and identical
+chunks requested concurrently share one round trip. Backends are
+pluggable; LocalBackend needs no network and is meant for tests and
+benchmarks.
+"""
+from cache import LRUCache
+from singleflight import SingleFlight
+import asyncio
+import hashlib
+import re
+
+
+class GoogleWebBackend:
+    """
+    Google Translate's mobile web endpoint (the one deep_translator scrapes),
+    called through one pooled, keep-alive httpx client.
+    """
+
+    BASE_URL = "https://translate.google.com/m"
+
+    def __init__(self, timeout: float = 10.0, max_connections: int = 20):
+        import httpx
+        self._client = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+
+    async def translate(self, text: str, target: str) -> str:
+        from bs4 import BeautifulSoup
+        response = await self._client.get(self.BASE_URL, params={"sl": "auto", "tl": target, "q": text})
+        response.raise_for_status()
+        soup = BeautifulSoup(response.text, "html.parser")
+        element = soup.find("div", {"class": "t0"}) or soup.find("div", {"class": "result-container"})
+        if element is None:
+            raise RuntimeError("Translation not found in response")
+        return element.get_text(strip=True)
+
+    async def aclose(self):
+        await self._client.aclose()
+
+
+class LocalBackend:
+    """Offline stand-in: tags text with the target language after an optional simulated delay."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+
+    async def translate(self, text: str, target: str) -> str:
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return f"[{target}] {text}"
+
+    async def aclose(self):
+        pass
+
+
+BACKENDS = {"google": GoogleWebBackend, "local": LocalBackend}
+
+
+def pack_lines(text: str, max_chars: int = 1500):
+    """
+    Packs consecutive lines into chunks of up to max_chars, so a typical
+    answer is a single request. A line longer than max_chars is split at
+    sentence ends into chunks of its own.
+    """
+    chunk = None
+    for line in text.split("\n"):
+        if len(line) > max_chars:
+            if chunk is not None:
+                yield chunk
+                chunk = None
+            yield from _split_sentences(line, max_chars)
+            continue
+        if chunk is not None and len(chunk) + 1 + len(line) > max_chars:
+            yield chunk
+            chunk = None
+        chunk = line if chunk is None else f"{chunk}\n{line}"
+    if chunk is not None:
+        yield chunk
+
+
+def _split_sentences(line: str, max_chars: int):
+    chunk = ""
+    for sentence in re.split(r"(?<=[.!?])\s+", line):
+        if chunk and len(chunk) + len(sentence) + 1 > max_chars:
+            yield chunk
+            chunk = ""
+        chunk = f"{chunk} {sentence}" if chunk else sentence
+    if chunk:
+        yield chunk
+
+
+class TranslationService:
+    def __init__(self, backend, cache_size: int = 4096, cache_ttl: float = None,
+                 max_chunk_chars: int = 1500, max_concurrency: int = 8):
+        self.backend = backend
+        self.cache = LRUCache(maxsize=cache_size, ttl=cache_ttl)
+        self.max_chunk_chars = max_chunk_chars
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._flights = SingleFlight()
+
+    async def _translate_chunk(self, chunk: str, target: str) -> str:
+        if not chunk.strip():
+            return chunk
+        key = (hashlib.sha256(chunk.encode("utf-8")).hexdigest(), target)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        return await self._flights.do(key, lambda: self._fetch(key, chunk, target))
+
+    async def _fetch(self, key, chunk: str, target: str) -> str:
+        async with self._semaphore:
+            translated = await self.backend.translate(chunk, target)
+        self.cache.set(key, translated)
+        return translated
+
+    async def translate(self, text: str, target: str) -> str:
+        """Translates text chunk by chunk, preserving the line structure."""
+        chunks = list(pack_lines(text, self.max_chunk_chars))
+        translated = await asyncio.gather(*(self._translate_chunk(chunk, target) for chunk in chunks))
+        return "\n".join(translated)
+
+    async def aclose(self):
+        await self.backend.aclose()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self.cache),
+            "hits": self.cache.hits,
+            "misses": self.cache.misses,
+            "coalesced": self._flights.shared,
+        }
@@ -0,0 +1,135 @@
+"""
+Write-behind persistence for chat rows.
+
+Request handlers hand rows to a WriteBehindQueue instead of committing
+them one by one. A single background task drains the queue and writes
+everything that is waiting in one transaction, so concurrent chats share
+a commit (and, on SQLite, an fsync) instead of queueing on the database
+lock. Callers can await the returned future to know their row is
+durable, or ignore it for fire-and-forget writes. A batch that fails is
+retried row by row, so one bad row does not fail the others.
+"""
+import asyncio
+import logging
+
+from metrics import registry, stage_timer
+
+BATCH_SIZE = registry.histogram(
+    "chat_write_batch_size",
+    "Rows written per write-behind transaction.",
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500),
+)
+
+
+class WriteBehindQueue:
+    """
+    Batches rows into transactions of at most `max_batch` rows. A batch is
+    written as soon as the writer is free; when fewer than `max_batch` rows
+    are waiting it lingers up to `flush_interval` seconds for more.
+    `write_batch(session, rows)` adds the rows to the session; the queue
+    commits. `max_pending` bounds memory: submit() waits when it is full.
+    """
+
+    def __init__(self, session_factory, write_batch, max_batch: int = 100,
+                 flush_interval: float = 0.01, max_pending: int = 10000):
+        self.session_factory = session_factory
+        self.write_batch = write_batch
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._queue = None
+        self._task = None
+        self.batches = 0
+        self.rows = 0
+        self.failures = 0
+
+    def start(self):
+        if self._task is None:
+            self._queue = asyncio.Queue(maxsize=self.max_pending)
+            self._task = asyncio.create_task(self._run())
+
+    async def submit(self, row) -> asyncio.Future:
+        """Queues a row; the returned future resolves once it is committed."""
+        if self._task is None:
+            raise RuntimeError("WriteBehindQueue is not running")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((row, future))
+        return future
+
+    async def _next_batch(self):
+        batch = [await self._queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.flush_interval
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _commit(self, rows):
+        async with self.session_factory() as session:
+            await self.write_batch(session, rows)
+            with stage_timer("db_commit"):
+                await session.commit()
+
+    async def _write(self, batch):
+        """
+        Commits the batch in one transaction. If that fails, each row is
+        retried in a transaction of its own, so only the waiters of rows
+        that still fail see an error.
+        """
+        try:
+            await self._commit([row for row, _ in batch])
+        except Exception as e:
+            self.failures += 1
+            logging.error(f"Write-behind batch of {len(batch)} rows failed: {e}")
+            if len(batch) > 1:
+                for item in batch:
+                    await self._write([item])
+                return
+            _, future = batch[0]
+            if not future.done():
+                future.set_exception(e)
+                future.exception()  # mark retrieved for fire-and-forget callers
+            return
+        self.batches += 1
+        self.rows += len(batch)
+        BATCH_SIZE.observe(len(batch))
+        for _, future in batch:
+            if not future.done():
+                future.set_result(None)
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            await self._write(batch)
+            for _ in batch:
+                self._queue.task_done()
+
+    async def stop(self):
+        """Writes out everything still queued, then stops the writer."""
+        if self._task is None:
+            return
+        await self._queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+            "batches": self.batches,
+            "rows": self.rows,
+            "failures": self.failures,
+        }
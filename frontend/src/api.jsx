@@ -34,4 +34,64 @@ api.interceptors.response.use(
     }
 );
 
+// Streams a chat answer from /chat/stream (Server-Sent Events over POST).
+// Calls onToken for every token event and resolves with the final "done" event.
+export const streamChat = async (payload, onToken) => {
+    const token = localStorage.getItem('authToken');
+    const response = await fetch(`${getApiUrl()}/chat/stream`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            ...(token ? { Authorization: `Bearer ${token}` } : {}),
+        },
+        body: JSON.stringify(payload),
+    });
+
+    if (response.status === 401) {
+        localStorage.removeItem('authToken');
+        window.location.href = '/login';
+    }
+    if (!response.ok) {
+        const error = new Error(`Request failed with status ${response.status}`);
+        error.response = { status: response.status };
+        throw error;
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let doneEvent = null;
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        let boundary = buffer.indexOf('\n\n');
+        while (boundary !== -1) {
+            const rawEvent = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            const data = rawEvent
+                .split('\n')
+                .filter((line) => line.startsWith('data:'))
+                .map((line) => line.slice(5).trimStart())
+                .join('\n');
+            if (data) {
+                const event = JSON.parse(data);
+                if (event.done) {
+                    doneEvent = event;
+                } else if (event.token) {
+                    onToken(event.token);
+                }
+            }
+            boundary = buffer.indexOf('\n\n');
+        }
+    }
+
+    if (!doneEvent) {
+        throw new Error('Network Error: stream ended unexpectedly');
+    }
+    return doneEvent;
+};
+
 export default api;
\ No newline at end of file
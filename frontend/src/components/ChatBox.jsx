@@ -1,5 +1,5 @@
 import React, { useState, useEffect, useRef, useCallback } from "react";
-import api from "../api";
+import api, { streamChat } from "../api";
 import { useAuth } from "../AuthContext";
 import Sidebar from "./Sidebar";
 import ResourceModal from "./ResourceModal";
@@ -74,6 +74,8 @@ const initBotMsg = () => ({
   timestamp: new Date()
 });
 
+const sessionLabel = (text) => text.length > 50 ? text.substring(0, 50) + "..." : text;
+
 const createSession = () => ({
   session_id: Date.now().toString() + Math.random().toString(36).substring(2, 11),
   label: "New Chat",
@@ -86,6 +88,7 @@ const ChatBox = () => {
   const [messages, setMessages] = useState([initBotMsg()]);
   const [loading, setLoading] = useState(false);
   const [sessions, setSessions] = useState([]);
+  const [sessionsCursor, setSessionsCursor] = useState(null);
   const [currentSessionId, setCurrentSessionId] = useState(null);
   const [isSidebarOpen, setIsSidebarOpen] = useState(false);
   const [isDarkTheme, setIsDarkTheme] = useState(false);
@@ -161,6 +164,7 @@ const ChatBox = () => {
         const sessionsData = response.data;
         
         setSessions(sessionsData);
+        setSessionsCursor(response.headers["x-next-cursor"] || null);
         
         if (sessionsData.length > 0) {
           setCurrentSessionId(null); 
@@ -264,39 +268,47 @@ const ChatBox = () => {
       sessionIdToSend = null; 
     }
 
+    const botMsgId = Date.now().toString() + '-bot';
+
     try {
-      const response = await api.post(
-        `${getApiUrl()}/chat`,
+      const result = await streamChat(
         { 
           user_message: messageText, 
           session_id: sessionIdToSend,
           language: selectedLanguage
         },
-        { timeout: 30000 }
+        (token) => {
+          setLoading(false);
+          setMessages(prev => {
+            const existing = prev.find(msg => msg.id === botMsgId);
+            if (!existing) {
+              return [...prev, {
+                id: botMsgId,
+                sender: "bot",
+                text: token,
+                timestamp: new Date(),
+                language: selectedLanguage
+              }];
+            }
+            return prev.map(msg => msg.id === botMsgId ? { ...msg, text: msg.text + token } : msg);
+          });
+        }
       );
       
-      const botMsg = { 
-        id: Date.now().toString() + '-bot',
-        sender: "bot", 
-        text: response.data.bot_response,
-        timestamp: new Date(),
-        language: selectedLanguage
-      };
-      
-      setMessages(prev => [...prev, botMsg]);
-      
-      const sessionsResponse = await api.get(`${getApiUrl()}/sessions`);
-      setSessions(sessionsResponse.data);
+      // The sidebar is updated locally; only a brand-new session needs an entry.
+      setSessions(prev => prev.some(s => s.session_id === result.session_id)
+        ? prev
+        : [{ session_id: result.session_id, label: sessionLabel(messageText), created: new Date() }, ...prev]);
       
       if (!currentSessionId) {
-        setCurrentSessionId(response.data.session_id);
+        setCurrentSessionId(result.session_id);
       }
     } catch (err) {
       console.error("Chat error:", err);
       
       let errorMessage = "Sorry, I'm experiencing connection issues. Please try again in a moment.";
       
-      if (err.code === 'NETWORK_ERROR' || err.message?.includes('Network Error')) {
+      if (err.code === 'NETWORK_ERROR' || err.message?.includes('Network Error') || err instanceof TypeError) {
         errorMessage = "Network error. Please check your connection and try again.";
         setError({ type: 'network', message: errorMessage });
       } else if (err.response?.status >= 500) {
@@ -338,8 +350,10 @@ const ChatBox = () => {
         }
       );
       
-      const sessionsResponse = await api.get(`${getApiUrl()}/sessions`);
-      setSessions(sessionsResponse.data);
+      setSessions(prev => [
+        { session_id: response.data.session_id, label: sessionLabel(initBotMsg().text), created: new Date() },
+        ...prev
+      ]);
       
       setCurrentSessionId(response.data.session_id);
       setMessages([initBotMsg()]);
@@ -374,12 +388,12 @@ const ChatBox = () => {
     try {
       await api.delete(`${getApiUrl()}/sessions/${sessionId}`);
       
-      const sessionsResponse = await api.get(`${getApiUrl()}/sessions`);
-      setSessions(sessionsResponse.data);
+      const remaining = sessions.filter(s => s.session_id !== sessionId);
+      setSessions(remaining);
       
       if (sessionId === currentSessionId) {
-        if (sessionsResponse.data.length > 0) {
-          setCurrentSessionId(sessionsResponse.data[0].session_id);
+        if (remaining.length > 0) {
+          setCurrentSessionId(remaining[0].session_id);
         } else {
           setCurrentSessionId(null);
           setMessages([initBotMsg()]);
@@ -389,7 +403,22 @@ const ChatBox = () => {
       console.error("Error deleting session:", error);
       setError({ type: 'server', message: 'Failed to delete conversation. Please try again.' });
     }
-  }, [sessions.length, currentSessionId]);
+  }, [sessions, currentSessionId]);
+
+  const handleLoadMoreSessions = useCallback(async () => {
+    if (!sessionsCursor) return;
+    try {
+      const response = await api.get(`/sessions`, { params: { cursor: sessionsCursor } });
+      setSessions(prev => [
+        ...prev,
+        ...response.data.filter(s => !prev.some(p => p.session_id === s.session_id))
+      ]);
+      setSessionsCursor(response.headers["x-next-cursor"] || null);
+    } catch (error) {
+      console.error("Error loading more sessions:", error);
+      setError({ type: 'server', message: 'Failed to load older conversations.' });
+    }
+  }, [sessionsCursor]);
 
   const toggleTheme = useCallback(() => {
     setIsDarkTheme(!isDarkTheme);
@@ -475,6 +504,8 @@ const ChatBox = () => {
         onClose={closeSidebar}
         onResourceClick={handleResourceClick}
         onLogout={handleLogout}
+        hasMore={Boolean(sessionsCursor)}
+        onLoadMore={handleLoadMoreSessions}
       />
       
       <div className="chatbox-container">
@@ -28,7 +28,7 @@ const LogoutIcon = () => (
 );
 
 
-const Sidebar = ({ sessions, currentSession, onSelectSession, onDeleteSession, onNewChat, isOpen, onClose, onResourceClick ,onLogout}) => {
+const Sidebar = ({ sessions, currentSession, onSelectSession, onDeleteSession, onNewChat, isOpen, onClose, onResourceClick ,onLogout, hasMore, onLoadMore}) => {
   const [searchTerm, setSearchTerm] = useState("");
 
   const filteredSessions = sessions.filter(session => 
@@ -122,6 +122,11 @@ const Sidebar = ({ sessions, currentSession, onSelectSession, onDeleteSession, o
                 </div>
               ))
             )}
+            {hasMore && (
+              <button className="sidebar-load-more" onClick={onLoadMore}>
+                Load older conversations
+              </button>
+            )}
           </div>
           
           <div className="legal-resources">